@@ -0,0 +1,386 @@
+import asyncio
+import os
+import time
+
+import aiohttp
+import requests
+from dotenv import set_key
+
+from codec import encode_json_body
+from instrumentation import add_pending, take_pending, record_token_wait
+from result_cache import dql_key, view_key
+from singleflight import AsyncSingleFlight
+from spaceandtimesdk import SpaceAndTimeSDK
+from transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from validation import validate_string, validate_number
+from view_batch import unique_parameter_sets, failure_summary, DEFAULT_VIEW_WORKERS
+
+DEFAULT_MAX_CONCURRENCY = 50
+SQL_STATEMENT_TYPES = ("DDL", "DML", "DQL")
+
+
+# Adds the time spent opening connections to the pending connect time of the calling task,
+# and the size of each request chunk sent to the request's instrumentation event.
+def connection_trace():
+    async def connection_started(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def connection_created(session, context, params):
+        add_pending("connect", time.perf_counter() - context.connect_started)
+
+    async def chunk_sent(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx.request_bytes += len(params.chunk)
+
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_start.append(connection_started)
+    trace.on_connection_create_end.append(connection_created)
+    trace.on_request_chunk_sent.append(chunk_sent)
+    return trace
+
+class AsyncSpaceAndTimeSDK:
+    # asyncio counterpart of SpaceAndTimeSDK. Every method is a coroutine returning the same
+    # {"response": ..., "error": ...} object as its synchronous version, and at most
+    # `max_concurrency` gateway calls are in flight at once. The connection pool holds pool_size
+    # connections, max_concurrency by default; with a smaller pool_size the calls beyond it wait
+    # for a free connection. `sdk_options` are passed to the SpaceAndTimeSDK handling
+    # authentication: identity, token store, codec and compression options.
+    def __init__(self, pool_size=None, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_concurrency=DEFAULT_MAX_CONCURRENCY, hooks=None,
+                 **sdk_options):
+        self.base_url = os.getenv('BASEURL')
+        if max_concurrency < 1 or (pool_size is not None and pool_size < 1):
+            raise ValueError("max_concurrency and pool_size must be at least 1")
+        self.pool_size = pool_size or max_concurrency
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_concurrency = max_concurrency
+
+        # Created on first use so that they bind to the running event loop.
+        self.session = None
+        self.semaphore = None
+
+        # Token renewal is shared with a synchronous SDK running in a worker thread,
+        # so reading a fresh token never blocks the event loop.
+        self.auth_sdk = SpaceAndTimeSDK(pool_size=1, connect_timeout=connect_timeout, read_timeout=read_timeout, hooks=hooks, **sdk_options)
+        self.token_manager = self.auth_sdk.token_manager
+        self.keyring = self.auth_sdk.keyring
+
+        # Request hooks are shared with the synchronous SDK so token renewals are reported too.
+        self.instrumentation = self.auth_sdk.instrumentation
+
+        # So are the JSON codec and request compression settings. aiohttp negotiates and decodes
+        # compressed responses itself.
+        self.codec = self.auth_sdk.codec
+        self.compress_min_bytes = self.auth_sdk.transport.compress_min_bytes
+
+        # Concurrent identical DQL and view reads share one gateway request.
+        self.single_flight = AsyncSingleFlight() if self.auth_sdk.single_flight is not None else None
+
+    # Signing and payload helpers are shared with the synchronous SDK.
+    signature_generation = SpaceAndTimeSDK.signature_generation
+    signing_keys_convert = SpaceAndTimeSDK.signing_keys_convert
+    sql_payload = SpaceAndTimeSDK.sql_payload
+    add_hook = SpaceAndTimeSDK.add_hook
+    remove_hook = SpaceAndTimeSDK.remove_hook
+
+    # Biscuits are minted and cached by the synchronous SDK, with its keys.
+    def biscuit_for(self, resource_ids, capabilities, private_key=None):
+        return self.auth_sdk.biscuit_for(resource_ids, capabilities, private_key)
+
+    def biscuit_from_datalog(self, path, private_key=None):
+        return self.auth_sdk.biscuit_from_datalog(path, private_key)
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, trace_configs=[connection_trace()])
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        self.auth_sdk.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Sends a request through the pooled aiohttp session under the flow control of the synchronous
+    # SDK, which limits concurrency per endpoint class and retries throttled calls.
+    async def request(self, method, api_endpoint, **kwargs):
+        if kwargs.get("json") is not None:
+            kwargs["data"], kwargs["headers"] = encode_json_body(self.codec, kwargs.pop("json"), kwargs.get("headers"), self.compress_min_bytes)
+        flow_control = self.auth_sdk.flow_control
+        if flow_control is None:
+            return (await self.send(method, api_endpoint, **kwargs))[2]
+
+        gate = flow_control.gate(api_endpoint)
+        attempt = 0
+        while True:
+            try:
+                ticket = await gate.enter_async()
+            except requests.exceptions.RequestException as error:
+                return {"response" : None, "error" : str(error)}
+
+            try:
+                status, headers, data = await self.send(method, api_endpoint, **kwargs)
+            except BaseException:
+                # Cancelled, or failed outside aiohttp: the call has no outcome to record.
+                gate.abandon(ticket)
+                raise
+            error = None if status is not None else data["error"]
+            overloaded, delay = gate.complete(method, status, headers, error, attempt)
+            gate.limiter.release(ticket, overloaded)
+
+            if delay is None:
+                return data
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # Sends one request, bounded by max_concurrency. Returns its status (None when no response
+    # arrived), headers and result.
+    async def send(self, method, api_endpoint, **kwargs):
+        event = self.instrumentation.start(method, api_endpoint) if self.instrumentation else None
+        started = time.perf_counter()
+        status = headers = None
+        try:
+            session = self.get_session()
+            async with self.semaphore:
+                async with session.request(method, f"{self.base_url}{api_endpoint}", trace_request_ctx=event, **kwargs) as response:
+                    status, headers = response.status, response.headers
+                    if event is not None:
+                        event.connect = take_pending("connect")
+                        event.ttfb = time.perf_counter() - started
+                        event.status = response.status
+                    response.raise_for_status()
+                    text = await response.text()
+                    if event is not None:
+                        event.download = time.perf_counter() - started - event.ttfb
+                        event.response_bytes = response.content.total_bytes
+                        self.instrumentation.finish(event, started)
+                    return status, headers, {"response" : text, "error" : None}
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            if event is not None and event.total == 0.0:
+                event.connect = event.connect or take_pending("connect")
+                event.error = error
+                self.instrumentation.finish(event, started)
+            return status, headers, {"response" : None, "error" : str(error) or type(error).__name__}
+
+    async def bearer_headers(self, token_name="accessToken"):
+        if token_name == "refreshToken":
+            token = self.token_manager.refresh_token()
+        else:
+            if self.token_manager.needs_renewal():
+                started = time.perf_counter()
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.token_manager.renew)
+                finally:
+                    record_token_wait(time.perf_counter() - started)
+            token = self.token_manager.tokens["accessToken"]
+        return {
+            "accept": "application/json",
+            "Authorization" : f'Bearer {token}'
+        }
+
+    """ Authentication APIs """
+    async def check_user_identifier(self, user_id):
+        headers = {"accept": "application/json"}
+        return await self.request("GET", f"/auth/idexists/{user_id}", headers=headers)
+
+    async def generate_auth_code(self, user_id, prefix, join_code):
+        payload = {
+            'userId': user_id,
+            'prefix': prefix,
+            'joinCode': join_code,
+        }
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json"
+        }
+        return await self.request("POST", "/auth/code", json=payload, headers=headers)
+
+    async def generate_tokens(self, user_id, auth_code, private_key, public_key, scheme="ed25519"):
+        signature_contents = self.signature_generation(auth_code, private_key, public_key)
+        b64_private_key, b64_public_key, hex_signature = signature_contents.values()
+
+        payload = {
+            'userId': user_id,
+            'authCode': auth_code,
+            'signature': hex_signature,
+            'key': b64_public_key,
+            'scheme': scheme
+        }
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json"
+        }
+        return await self.request("POST", "/auth/token", json=payload, headers=headers)
+
+    async def authenticate(self, priv_key="", pub_key="", prefix=""):
+        priv_key, pub_key = self.auth_sdk.resolve_keys(priv_key, pub_key)
+        user_id = self.auth_sdk.setting('USERID')
+        join_code = self.auth_sdk.setting('JOINCODE')
+        scheme = self.auth_sdk.setting('SCHEME') or "ed25519"
+
+        auth_code_data = await self.generate_auth_code(user_id, prefix or self.auth_sdk.prefix, join_code)
+        if auth_code_data["error"]: raise Exception(auth_code_data["error"])
+
+        auth_code = self.codec.loads(auth_code_data["response"])["authCode"]
+
+        tokens_data = await self.generate_tokens(user_id, auth_code, priv_key, pub_key, scheme)
+        if tokens_data["error"]: raise Exception(tokens_data["error"])
+
+        jsonResponse = self.codec.loads(tokens_data["response"])
+        self.token_manager.update(jsonResponse)
+
+        if self.auth_sdk.use_env and self.auth_sdk.write_env:
+            set_key(".env", "PUBLICKEY", pub_key)
+            set_key(".env", "PRIVATEKEY", priv_key)
+
+        return {"response" : jsonResponse, "error" : None}
+
+    async def validate_token(self):
+        return await self.request("GET", "/auth/validtoken", headers=await self.bearer_headers())
+
+    async def refresh_token(self):
+        token_data = await self.request("POST", "/auth/refresh", headers=await self.bearer_headers("refreshToken"))
+        if token_data["error"] is None:
+            jsonResponse = self.codec.loads(token_data["response"])
+            self.token_manager.update(jsonResponse)
+        return token_data
+
+    async def logout(self):
+        logout_data = await self.request("POST", "/auth/logout", headers=await self.bearer_headers("refreshToken"))
+        if logout_data["error"] is None:
+            self.token_manager.clear()
+        return logout_data
+
+    """ Discovery APIs """
+    async def discovery_request(self, api_endpoint, params=None):
+        return await self.request("GET", api_endpoint, params=params, headers=await self.bearer_headers())
+
+    async def get_namespaces(self):
+        return await self.discovery_request("/discover/namespace")
+
+    async def get_tables(self, scope, namespace):
+        validate_string(scope)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/table", {"scope": scope.upper(), "namespace": namespace.upper()})
+
+    async def get_table_columns(self, table_name, namespace):
+        validate_string(table_name)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/table/column", {"namespace": namespace.upper(), "table": table_name.upper()})
+
+    async def get_table_indexes(self, table_name, namespace):
+        validate_string(table_name)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/table/index", {"namespace": namespace.upper(), "table": table_name.upper()})
+
+    async def get_table_primary_keys(self, table_name, namespace):
+        validate_string(table_name)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/table/primaryKey", {"namespace": namespace.upper(), "table": table_name.upper()})
+
+    async def get_table_relationships(self, scope, namespace):
+        validate_string(scope)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/table/relations", {"namespace": namespace.upper(), "scope": scope.upper()})
+
+    async def get_primary_key_references(self, table_name, column, namespace):
+        validate_string(table_name)
+        validate_string(column)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/refs/primarykey", {"namespace": namespace.upper(), "table": table_name.upper(), "column": column.upper()})
+
+    async def get_foreign_key_references(self, table_name, column, namespace):
+        validate_string(table_name)
+        validate_string(column)
+        validate_string(namespace)
+        return await self.discovery_request("/discover/refs/foreignkey", {"namespace": namespace.upper(), "table": table_name.upper(), "column": column.upper()})
+
+    """ Core SQL APIs """
+    async def sql_request(self, api_endpoint, payload):
+        headers = await self.bearer_headers()
+        headers["content-type"] = "application/json"
+        return await self.request("POST", api_endpoint, json=payload, headers=headers)
+
+    async def CreateSchema(self, sql_text, biscuit=""):
+        validate_string(sql_text)
+        payload = {
+            "sqlText": sql_text,
+            "biscuits": [biscuit] if biscuit else []
+        }
+        return await self.sql_request("/sql/ddl", payload)
+
+    async def DDLCreateTable(self, resource_id, sql_text, access_type, public_key, biscuit):
+        validate_string(access_type)
+        validate_string(public_key)
+        create_sql_text = f'{sql_text} WITH "public_key={public_key},access_type={access_type}"'
+        return await self.sql_request("/sql/ddl", self.sql_payload(resource_id, create_sql_text, biscuit))
+
+    async def DDL(self, resource_id, sql_text, biscuit):
+        return await self.sql_request("/sql/ddl", self.sql_payload(resource_id, sql_text, biscuit))
+
+    async def DML(self, resource_id, sql_text, biscuit):
+        return await self.sql_request("/sql/dml", self.sql_payload(resource_id, sql_text, biscuit))
+
+    async def DQL(self, resource_id, sql_text, biscuit, row_count=0):
+        validate_number(row_count)
+        payload = self.sql_payload(resource_id, sql_text, biscuit)
+        if row_count > 0:
+            payload["rowCount"] = row_count
+        if self.single_flight is None:
+            return await self.sql_request("/sql/dql", payload)
+        read_key = dql_key(payload["resourceId"], sql_text, self.auth_sdk.identity(), biscuit, row_count)
+        return dict(await self.single_flight.do(read_key, lambda: self.sql_request("/sql/dql", payload)))
+
+    """ Views API """
+    async def execute_view(self, view_name, parameters_request=[]):
+        validate_string(view_name)
+        params = {"params": self.codec.dumps(parameters_request).decode("utf-8")} if parameters_request else None
+
+        async def view_request():
+            return await self.request("GET", f"/sql/views/{view_name}", params=params, headers=await self.bearer_headers())
+
+        if self.single_flight is None:
+            return await view_request()
+        return dict(await self.single_flight.do(view_key(view_name, parameters_request, self.auth_sdk.identity()), view_request))
+
+    # Executes a view once for each distinct parameter set, at most `workers` at a time, and returns
+    # the results tagged by parameter set as SpaceAndTimeSDK.execute_views does for text results.
+    async def execute_views(self, view_name, parameter_sets, workers=DEFAULT_VIEW_WORKERS):
+        validate_string(view_name)
+        parameter_sets = unique_parameter_sets(parameter_sets)
+        semaphore = asyncio.Semaphore(workers)
+
+        async def run(index, parameters_request):
+            async with semaphore:
+                view_data = await self.execute_view(view_name, parameters_request)
+            return {
+                "parameter_set": index,
+                "parameters": parameters_request,
+                "response": view_data["response"],
+                "error": view_data["error"]
+            }
+
+        results = await asyncio.gather(*(run(index, parameters_request) for index, parameters_request in enumerate(parameter_sets)))
+        failed = [result for result in results if result["error"]]
+        return {"response" : results, "error" : failure_summary(failed, len(parameter_sets))}
+
+    # Submits many SQL statements at once and returns their results in submission order.
+    # Each statement is a (statement_type, resource_id, sql_text, biscuit) tuple where
+    # statement_type is one of DDL, DML or DQL; concurrency stays bounded by max_concurrency.
+    async def gather(self, statements):
+        statements = list(statements)
+        for statement_type, *_ in statements:
+            if statement_type not in SQL_STATEMENT_TYPES:
+                raise ValueError(f"Unsupported statement type {statement_type}, expected one of {', '.join(SQL_STATEMENT_TYPES)}")
+
+        return await asyncio.gather(*(getattr(self, statement_type)(resource_id, sql_text, biscuit)
+                                      for statement_type, resource_id, sql_text, biscuit in statements))
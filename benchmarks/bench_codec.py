@@ -0,0 +1,108 @@
+# JSON codec and compression benchmark: encode and decode cost of each installed codec on
+# result sets of realistic sizes and on a bulk DML request body, and the time and size of
+# gzip compressing them. With --gateway it also measures a DQL round trip against the stub
+# gateway with and without compressed responses.
+#
+#   python benchmarks/bench_codec.py --rows 1000,100000 --repeat 5
+#   python benchmarks/bench_codec.py --rows 100000 --gateway
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_insert import BulkStatementBuilder
+from codec import CODECS, COMPRESS_LEVEL, get_codec
+from stub_gateway import StubGateway
+
+
+def result_rows(count, payload_bytes):
+    payload = "x" * payload_bytes
+    return [{"ID": index, "NAME": f"name-{index}", "VALUE": index * 0.5, "PAYLOAD": payload} for index in range(count)]
+
+
+def bulk_payload(count):
+    builder = BulkStatementBuilder("BENCH.ROWS", ["ID", "NAME", "VALUE"], max_payload_bytes=float("inf"))
+    _, _, sql_text = next(builder.batches([[index, f"name-{index}", index * 0.5] for index in range(count)]))
+    return {"resourceId": "BENCH.ROWS", "sqlText": sql_text, "biscuits": []}
+
+
+def best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def installed_codecs():
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name} is not installed, skipping")
+    return codecs
+
+
+def bench_codecs(name, value, codecs, repeat):
+    encoded = codecs[0].dumps(value)
+    print(f"{name}: {len(encoded) / 2 ** 20:.2f} MiB")
+    baseline = None
+    for codec in codecs:
+        encode = best_time(lambda: codec.dumps(value), repeat)
+        decode = best_time(lambda: codec.loads(encoded), repeat)
+        baseline = baseline or (encode, decode)
+        print(f"  {codec.name:<8} encode {encode * 1000:>8.1f} ms ({baseline[0] / encode:>4.1f}x)   decode {decode * 1000:>8.1f} ms ({baseline[1] / decode:>4.1f}x)")
+
+    compressed = gzip.compress(encoded, COMPRESS_LEVEL)
+    compress = best_time(lambda: gzip.compress(encoded, COMPRESS_LEVEL), repeat)
+    decompress = best_time(lambda: gzip.decompress(compressed), repeat)
+    print(f"  gzip     {len(encoded) / len(compressed):.1f}x smaller, compress {compress * 1000:.1f} ms, decompress {decompress * 1000:.1f} ms")
+
+
+def bench_gateway(rows, codecs, repeat):
+    from keygen import generate_keys
+    from spaceandtimesdk import SpaceAndTimeSDK
+
+    keys = generate_keys()
+    sql_text = f"SELECT * FROM BENCH.ROWS LIMIT {rows}"
+    for gzip_responses in (False, True):
+        with tempfile.TemporaryDirectory() as directory, StubGateway(gzip_responses=gzip_responses) as gateway:
+            os.environ.update({"BASEURL": gateway.base_url, "USERID": "bench-user", "JOINCODE": "bench-join-code",
+                               "PUBLICKEY": keys["b64_public_key"], "PRIVATEKEY": keys["b64_private_key"]})
+            for codec in codecs:
+                sdk = SpaceAndTimeSDK(background_refresh=False, session_file=os.path.join(directory, "session.txt"),
+                                      write_env=False, coalesce=False, codec=codec)
+                sdk.authenticate()
+                elapsed = best_time(lambda: sdk.codec.loads(sdk.DQL("BENCH.ROWS", sql_text, "")["response"]), repeat)
+                print(f"  DQL {rows} rows, {'gzip' if gzip_responses else 'identity':<8} responses, {codec.name:<8} {elapsed * 1000:>8.1f} ms")
+                sdk.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON codecs and gzip on SDK sized payloads.")
+    parser.add_argument("--rows", default="1000,100000", help="comma separated result sizes")
+    parser.add_argument("--payload-bytes", type=int, default=32)
+    parser.add_argument("--bulk-rows", type=int, default=20000, help="rows of the bulk INSERT request body")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--gateway", action="store_true", help="also time DQL round trips against the stub gateway")
+    args = parser.parse_args()
+
+    codecs = installed_codecs()
+    row_counts = [int(count) for count in args.rows.split(",")]
+    for count in row_counts:
+        bench_codecs(f"result of {count} rows", result_rows(count, args.payload_bytes), codecs, args.repeat)
+    bench_codecs(f"bulk INSERT of {args.bulk_rows} rows", bulk_payload(args.bulk_rows), codecs, args.repeat)
+
+    if args.gateway:
+        bench_gateway(max(row_counts), codecs, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# End to end SDK benchmarks against the local stub gateway (benchmarks/stub_gateway.py):
+# authentication throughput, token refresh contention, DQL latency percentiles, large result
+# decode time and memory, and import time. The stub runs in its own process and the SDK
+# writes its session.txt / .env into a temporary directory.
+#
+#   python benchmarks/bench_gateway.py --latency-ms 20 --save before.json
+#   python benchmarks/bench_gateway.py --latency-ms 20 --compare before.json
+#   python benchmarks/bench_gateway.py --only dql,decode --dql-requests 2000 --concurrency 32
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+import bench_startup
+from stub_gateway import StubGateway
+
+SECTIONS = ("startup", "auth", "refresh", "dql", "decode")
+
+# Seconds left on the access token the refresh benchmark starts from, well inside the renewal margin.
+EXPIRING_TOKEN_SECONDS = 1
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def latency_summary(latencies, elapsed):
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(milliseconds, 0.50),
+        "p90_ms": percentile(milliseconds, 0.90),
+        "p99_ms": percentile(milliseconds, 0.99),
+        "max_ms": max(milliseconds),
+    }
+
+
+def configure_environment(gateway):
+    from keygen import generate_keys
+
+    keys = generate_keys()
+    os.environ.update({
+        "BASEURL": gateway.base_url,
+        "USERID": "bench-user",
+        "JOINCODE": "bench-join-code",
+        "PREFIX": "",
+        "SCHEME": "ed25519",
+        "PUBLICKEY": keys["b64_public_key"],
+        "PRIVATEKEY": keys["b64_private_key"],
+    })
+
+
+def new_sdk(**options):
+    from spaceandtimesdk import SpaceAndTimeSDK
+
+    return SpaceAndTimeSDK(background_refresh=False, **options)
+
+
+def bench_startup_time(args, gateway):
+    interpreter = statistics.median(bench_startup.baseline_interpreter() for _ in range(args.startup_runs))
+    timings = [bench_startup.run_import("spaceandtimesdk") - interpreter for _ in range(args.startup_runs)]
+    return {"import_median_ms": statistics.median(timings), "import_min_ms": min(timings)}
+
+
+# Full authentications (auth code, signature, token request, session write) per second.
+def bench_auth(args, gateway):
+    sdk = new_sdk(pool_size=args.concurrency)
+    sdk.authenticate()
+
+    def authenticate_once(_):
+        started = time.perf_counter()
+        sdk.authenticate()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    sequential = [authenticate_once(index) for index in range(args.auth_requests)]
+    sequential_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        concurrent = list(executor.map(authenticate_once, range(args.auth_requests)))
+    concurrent_elapsed = time.perf_counter() - started
+    sdk.close()
+
+    return {
+        "sequential_per_s": len(sequential) / sequential_elapsed,
+        "sequential_p50_ms": percentile(sequential, 0.5) * 1000,
+        "concurrent_per_s": len(concurrent) / concurrent_elapsed,
+        "concurrent_p99_ms": percentile(concurrent, 0.99) * 1000,
+    }
+
+
+# Many threads find an expiring access token at once; counts the refresh calls reaching the
+# gateway and how long the threads wait for a fresh token.
+def bench_refresh(args, gateway):
+    sdk = new_sdk(pool_size=args.concurrency)
+    sdk.authenticate()
+    tokens = dict(sdk.token_manager.tokens)
+    lifetime = sdk.token_manager.access_lifetime
+
+    waits = []
+    gateway.reset_stats()
+    for _ in range(args.refresh_rounds):
+        expires = int((time.time() + EXPIRING_TOKEN_SECONDS) * 1000)
+        sdk.token_manager.update(dict(tokens, accessTokenExpires=expires))
+        # The tokens keep the gateway's lifetime, so the margin is not capped below the time left.
+        sdk.token_manager.access_lifetime = lifetime
+        barrier = threading.Barrier(args.concurrency)
+
+        def read_token(_):
+            barrier.wait()
+            started = time.perf_counter()
+            sdk.token_manager.access_token()
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            waits.extend(executor.map(read_token, range(args.concurrency)))
+    sdk.close()
+
+    calls = gateway.stats()
+    refreshes = calls.get("/v1/auth/refresh", 0) + calls.get("/v1/auth/token", 0)
+    return {
+        "threads": args.concurrency,
+        "rounds": args.refresh_rounds,
+        "gateway_renewals_per_round": refreshes / args.refresh_rounds,
+        "wait_p50_ms": percentile(waits, 0.5) * 1000,
+        "wait_max_ms": max(waits) * 1000,
+    }
+
+
+def bench_dql(args, gateway):
+    sdk = new_sdk(pool_size=args.concurrency)
+    sdk.authenticate()
+    sql_text = f"SELECT * FROM BENCH.ROWS LIMIT {args.dql_rows}"
+
+    def query(_):
+        started = time.perf_counter()
+        result = sdk.DQL("BENCH.ROWS", sql_text, "")
+        if result["error"]:
+            raise RuntimeError(result["error"])
+        return time.perf_counter() - started
+
+    sequential = [query(index) for index in range(min(args.dql_requests, 200))]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        latencies = list(executor.map(query, range(args.dql_requests)))
+    elapsed = time.perf_counter() - started
+    sdk.close()
+
+    return {"sequential_p50_ms": percentile(sequential, 0.5) * 1000, **latency_summary(latencies, elapsed)}
+
+
+# Time and peak Python memory to decode one large DQL result in each result format.
+def bench_decode(args, gateway):
+    sdk = new_sdk()
+    sdk.authenticate()
+    sql_text = f"SELECT * FROM BENCH.ROWS LIMIT {args.decode_rows}"
+
+    def decode(result_format):
+        result = sdk.DQL("BENCH.ROWS", sql_text, "", result_format=result_format)
+        if result["error"]:
+            raise RuntimeError(result["error"])
+        response = result["response"]
+        if result_format == "text":
+            return len(json.loads(response))
+        if result_format == "stream":
+            return sum(1 for _ in response)
+        return len(response)
+
+    results = {"rows": args.decode_rows}
+    for result_format in args.decode_formats.split(","):
+        try:
+            started = time.perf_counter()
+            decode(result_format)
+            elapsed = time.perf_counter() - started
+
+            tracemalloc.start()
+            decode(result_format)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        except ImportError as error:
+            print(f"  skipping {result_format}: {error}")
+            continue
+        results[f"{result_format}_ms"] = elapsed * 1000
+        results[f"{result_format}_peak_mb"] = peak / 2 ** 20
+    sdk.close()
+    return results
+
+
+BENCHMARK_FUNCTIONS = {
+    "startup": bench_startup_time,
+    "auth": bench_auth,
+    "refresh": bench_refresh,
+    "dql": bench_dql,
+    "decode": bench_decode,
+}
+
+
+def print_results(results, baseline=None):
+    for section, values in results.items():
+        print(f"{section}:")
+        for name, value in values.items():
+            line = f"  {name:<28} {value:>12.2f}" if isinstance(value, float) else f"  {name:<28} {value:>12}"
+            previous = (baseline or {}).get(section, {}).get(name)
+            if isinstance(previous, (int, float)) and previous:
+                line += f"   {(value - previous) / previous * 100:+7.1f}% vs {previous:.2f}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SDK against a local stub gateway.")
+    parser.add_argument("--only", default=",".join(SECTIONS), help=f"comma separated subset of {','.join(SECTIONS)}")
+    parser.add_argument("--latency-ms", type=float, default=5, help="gateway delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--payload-bytes", type=int, default=32, help="size of the text column of each result row")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--auth-requests", type=int, default=200)
+    parser.add_argument("--refresh-rounds", type=int, default=20)
+    parser.add_argument("--dql-requests", type=int, default=1000)
+    parser.add_argument("--dql-rows", type=int, default=10)
+    parser.add_argument("--decode-rows", type=int, default=200000)
+    parser.add_argument("--decode-formats", default="text,stream,columns,dataframe")
+    parser.add_argument("--startup-runs", type=int, default=10)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="show the change against results saved with --save")
+    args = parser.parse_args()
+
+    sections = [section.strip() for section in args.only.split(",") if section.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(sorted(unknown))}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    results = {}
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory, StubGateway(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                                                   payload_bytes=args.payload_bytes) as gateway:
+        os.chdir(directory)
+        try:
+            configure_environment(gateway)
+            print(f"stub gateway {gateway.base_url}, latency {args.latency_ms} ms")
+            for section in sections:
+                results[section] = BENCHMARK_FUNCTIONS[section](args, gateway)
+                print_results({section: results[section]}, baseline)
+        finally:
+            os.chdir(working_directory)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
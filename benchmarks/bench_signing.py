@@ -0,0 +1,59 @@
+# Signing microbenchmark: the original per-call path (decode the Base64 key, build a
+# SigningKey, sign, hexlify and slice) against the cached keyring and its batched call.
+#
+#   python benchmarks/bench_signing.py --signatures 10000 --identities 50
+
+import argparse
+import base64
+import binascii
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nacl.signing import SigningKey
+
+from keygen import generate_keys
+from signing_keyring import SigningKeyring
+
+
+def per_call_signature(auth_code, b64_private_key):
+    signing_key = SigningKey(base64.b64decode(b64_private_key))
+    return binascii.hexlify(signing_key.sign(bytes(auth_code, 'utf-8'))).decode()[:128]
+
+
+def measure(name, function, count):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed * 1000:>9.1f} ms  {count / elapsed:>10.0f} signatures/s  {elapsed / count * 1e6:>7.1f} us/signature")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call and cached Ed25519 auth code signing.")
+    parser.add_argument("--signatures", type=int, default=10000)
+    parser.add_argument("--identities", type=int, default=50)
+    args = parser.parse_args()
+
+    private_keys = [generate_keys()["b64_private_key"] for _ in range(args.identities)]
+    work = [(uuid.uuid4().hex, private_keys[index % args.identities]) for index in range(args.signatures)]
+
+    keyring = SigningKeyring()
+    expected = [per_call_signature(auth_code, private_key) for auth_code, private_key in work[:10]]
+    assert keyring.sign_many(work[:10]) == expected, "keyring signatures differ from the per-call path"
+    keyring.clear()
+
+    print(f"{args.signatures} signatures over {args.identities} identities")
+    per_call = measure("per call", lambda: [per_call_signature(auth_code, key) for auth_code, key in work], args.signatures)
+    cached = measure("keyring.sign", lambda: [keyring.sign(auth_code, key) for auth_code, key in work], args.signatures)
+    keyring.clear()
+    batched = measure("keyring.sign_many", lambda: keyring.sign_many(work), args.signatures)
+
+    print(f"speedup: sign {per_call / cached:.2f}x, sign_many {per_call / batched:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
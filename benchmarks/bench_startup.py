@@ -0,0 +1,86 @@
+# Cold start benchmark: how long a fresh interpreter takes to import the SDK.
+# Each run is a new process so nothing is cached in sys.modules.
+#
+#   python benchmarks/bench_startup.py --runs 20 --max-ms 250
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Crypto stacks that must not be loaded just by importing the SDK.
+HEAVY_MODULES = ("nacl", "ed25519", "cryptography", "Cryptodome")
+
+IMPORT_CHECK = (
+    "import sys, spaceandtimesdk, keygen;"
+    "heavy = [m for m in {modules!r} if m in sys.modules];"
+    "generated = keygen._exported_keys is not None;"
+    "print(','.join(heavy) + '|' + str(generated))"
+)
+
+
+def run_import(module):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def baseline_interpreter():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=ROOT, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+# Top cumulative import times reported by `python -X importtime`.
+def slowest_imports(module, limit):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure SDK import time in fresh interpreters.")
+    parser.add_argument("--module", default="spaceandtimesdk")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail when the median import time is above this")
+    args = parser.parse_args()
+
+    interpreter = statistics.median(baseline_interpreter() for _ in range(args.runs))
+    timings = [run_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(timings) - interpreter
+
+    print(f"import {args.module}: median {median:.1f} ms, min {min(timings) - interpreter:.1f} ms over {args.runs} runs (interpreter start {interpreter:.1f} ms excluded)")
+    print("slowest imports (cumulative us):")
+    for cumulative, name in slowest_imports(args.module, args.top):
+        print(f"  {cumulative:>8}  {name}")
+
+    check = subprocess.run([sys.executable, "-c", IMPORT_CHECK.format(modules=HEAVY_MODULES)],
+                           cwd=ROOT, check=True, capture_output=True, text=True).stdout.strip()
+    heavy, generated = check.split("|")
+
+    failures = []
+    if heavy:
+        failures.append(f"crypto modules loaded at import time: {heavy}")
+    if generated == "True":
+        failures.append("keys were generated at import time")
+    if args.max_ms is not None and median > args.max_ms:
+        failures.append(f"median import time {median:.1f} ms is above {args.max_ms} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Pre-flight validation benchmark: resource ID parsing, Base64 checks and statement
+# classification, compared with the original uncompiled regex and AES based check.
+#
+#   python benchmarks/bench_validation.py --ids 10000 --repeat 5
+
+import argparse
+import base64
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import validation
+from sql_router import classify
+
+
+def original_try_parse_identifier(resource_id):
+    parts = resource_id.upper().split(".")
+    if len(parts) == 0 or len(parts) > 2:
+        raise ValueError(validation.INVALID_RESOURCEID)
+    schema_name, table_name = (validation.DEFAULT_SCHEMA, parts[0]) if len(parts) == 1 else parts
+    if re.match(validation.VALID_DB_RESOURCE_IDENTIFIER, schema_name) is None or re.match(validation.VALID_DB_RESOURCE_IDENTIFIER, table_name) is None:
+        raise ValueError(validation.INVALID_RESOURCEID)
+    return (schema_name, table_name)
+
+
+def original_is_base64(s):
+    from Cryptodome.Cipher import AES
+
+    s = s.replace('-', '+').replace('_', '/')
+    s += '=' * (-len(s) % 4)
+    cipher = AES.new(b'A' * 32, AES.MODE_CBC, iv=b'B' * 16)
+    cipher.decrypt(base64.b64decode(s))
+    return True
+
+
+def measure(name, function, count, repeat):
+    best = min(timed(function) for _ in range(repeat))
+    print(f"{name:<36} {best * 1000:>9.2f} ms  {best / count * 1e6:>8.3f} us/call")
+    return best
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cost of SDK pre-flight validation.")
+    parser.add_argument("--ids", type=int, default=10000, help="distinct resource IDs")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    resource_ids = [f"ETH.TABLE_{index}" for index in range(args.ids)]
+    encoded = [base64.urlsafe_b64encode(os.urandom(32)).decode().rstrip("=") for _ in range(1000)]
+    statements = [f"SELECT * FROM ETH.TABLE_{index % 100} WHERE ID = {index}" for index in range(args.ids)]
+
+    print(f"{args.ids} resource IDs, best of {args.repeat}")
+    original = measure("original try_parse_identifier", lambda: [original_try_parse_identifier(resource_id) for resource_id in resource_ids], args.ids, args.repeat)
+    validation.try_parse_identifier.cache_clear()
+    cold = measure("try_parse_identifier (cold)", lambda: [validation.try_parse_identifier(resource_id) for resource_id in resource_ids], args.ids, 1)
+    warm = measure("try_parse_identifier (memoized)", lambda: [validation.try_parse_identifier(resource_id) for resource_id in resource_ids], args.ids, args.repeat)
+    measure("parse_identifiers (batch)", lambda: validation.parse_identifiers(resource_ids), args.ids, args.repeat)
+    print(f"speedup: cold {original / cold:.1f}x, memoized {original / warm:.1f}x")
+
+    try:
+        original_base64 = measure("original is_base64 (AES)", lambda: [original_is_base64(value) for value in encoded], len(encoded), args.repeat)
+    except (ImportError, ValueError):
+        original_base64 = None
+    new_base64 = measure("is_base64", lambda: [validation.is_base64(value) for value in encoded], len(encoded), args.repeat)
+    if original_base64:
+        print(f"speedup: is_base64 {original_base64 / new_base64:.1f}x")
+
+    # Dashboards repeat a small set of statements, so the memoized run cycles over 100 of them.
+    repeated = statements[:100] * (len(statements) // 100)
+    classify.cache_clear()
+    measure("classify (cold)", lambda: [classify(statement) for statement in statements], len(statements), 1)
+    measure("classify (memoized)", lambda: [classify(statement) for statement in repeated], len(repeated), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# Local stand-in for the Space and Time gateway used by the benchmarks. It serves the /auth,
+# /discover, /sql and /sql/views endpoints the SDK calls with a configurable delay and result
+# size, and counts the calls it receives (GET /stats).
+#
+#   python benchmarks/stub_gateway.py --port 8765 --latency-ms 20 --rows 1000 --payload-bytes 64
+#
+# DQL statements ending in LIMIT n return n rows, anything else returns --rows rows.
+# Request bodies may be gzip compressed; results are gzip compressed with --gzip-responses.
+# With --max-in-flight the stub throttles like an overloaded gateway, answering 429 (with
+# --retry-after as Retry-After) to requests beyond that many at once.
+
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+
+from flask import Flask, Response, request
+
+API_PREFIX = "/v1"
+DEFAULT_LATENCY_MS = 0
+DEFAULT_ROWS = 100
+DEFAULT_PAYLOAD_BYTES = 32
+DEFAULT_TOKEN_TTL_MS = 25 * 60 * 1000
+
+# Rows are serialized in blocks of this many to stream large results.
+ROWS_PER_CHUNK = 1000
+
+BENCH_COLUMNS = [
+    {"column": "ID", "dataType": "BIGINT"},
+    {"column": "NAME", "dataType": "VARCHAR"},
+    {"column": "VALUE", "dataType": "DOUBLE"},
+    {"column": "PAYLOAD", "dataType": "VARCHAR"},
+]
+
+_limit = re.compile(r"\bLIMIT\s+(\d+)\s*;?\s*$", re.IGNORECASE)
+
+
+def result_chunks(row_count, payload_bytes):
+    # Yields the JSON array of row_count bench rows in blocks, without building it in memory.
+    payload = "x" * payload_bytes
+    yield "["
+    for start in range(0, row_count, ROWS_PER_CHUNK):
+        rows = (
+            json.dumps({"ID": index, "NAME": f"name-{index}", "VALUE": index * 0.5, "PAYLOAD": payload})
+            for index in range(start, min(start + ROWS_PER_CHUNK, row_count))
+        )
+        yield ("," if start else "") + ",".join(rows)
+    yield "]"
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode())
+    yield compressor.flush()
+
+
+def request_json():
+    body = request.get_data()
+    if request.headers.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def create_app(latency_ms=DEFAULT_LATENCY_MS, jitter_ms=0, rows=DEFAULT_ROWS,
+               payload_bytes=DEFAULT_PAYLOAD_BYTES, token_ttl_ms=DEFAULT_TOKEN_TTL_MS, gzip_responses=False,
+               max_in_flight=0, retry_after=None):
+    app = Flask(__name__)
+    calls = {}
+    calls_lock = threading.Lock()
+    in_flight = [0]
+
+    def result_response(row_count):
+        chunks = result_chunks(row_count, payload_bytes)
+        if gzip_responses and "gzip" in request.headers.get("Accept-Encoding", ""):
+            return Response(gzip_chunks(chunks), mimetype="application/json", headers={"Content-Encoding": "gzip"})
+        return Response(chunks, mimetype="application/json")
+
+    @app.before_request
+    def delay_and_count():
+        if request.path == "/stats":
+            return None
+        endpoint = request.url_rule.rule if request.url_rule else request.path
+        with calls_lock:
+            in_flight[0] += 1
+            request.environ["stub.counted"] = True
+            throttled = max_in_flight and in_flight[0] > max_in_flight
+            if throttled:
+                endpoint = "throttled"
+            calls[endpoint] = calls.get(endpoint, 0) + 1
+        if throttled:
+            headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+            return Response("Too many requests", status=429, headers=headers)
+        if latency_ms or jitter_ms:
+            time.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+        return None
+
+    @app.teardown_request
+    def finish_request(error):
+        if request.environ.pop("stub.counted", False):
+            with calls_lock:
+                in_flight[0] -= 1
+
+    def tokens():
+        now = int(time.time() * 1000)
+        return json.dumps({
+            "accessToken": f"access-{now}",
+            "refreshToken": f"refresh-{now}",
+            "accessTokenExpires": now + token_ttl_ms,
+            "refreshTokenExpires": now + 2 * token_ttl_ms
+        })
+
+    @app.get("/stats")
+    def stats():
+        with calls_lock:
+            return json.dumps(calls)
+
+    @app.delete("/stats")
+    def reset_stats():
+        with calls_lock:
+            calls.clear()
+        return "{}"
+
+    @app.get(API_PREFIX + "/auth/idexists/<user_id>")
+    def id_exists(user_id):
+        return "true"
+
+    @app.post(API_PREFIX + "/auth/code")
+    def auth_code():
+        return json.dumps({"authCode": os.urandom(16).hex()})
+
+    @app.post(API_PREFIX + "/auth/token")
+    def auth_token():
+        return tokens()
+
+    @app.post(API_PREFIX + "/auth/refresh")
+    def auth_refresh():
+        return tokens()
+
+    @app.get(API_PREFIX + "/auth/validtoken")
+    def valid_token():
+        return "bench-user"
+
+    @app.post(API_PREFIX + "/auth/logout")
+    def logout():
+        return "{}"
+
+    @app.get(API_PREFIX + "/discover/namespace")
+    def namespaces():
+        return json.dumps([{"namespace": "BENCH"}])
+
+    @app.get(API_PREFIX + "/discover/table")
+    def tables():
+        return json.dumps([{"namespace": "BENCH", "table": "ROWS"}])
+
+    @app.get(API_PREFIX + "/discover/table/column")
+    def columns():
+        return json.dumps(BENCH_COLUMNS)
+
+    @app.get(API_PREFIX + "/discover/<path:resource>")
+    def discover(resource):
+        return json.dumps([{"column": "ID", "position": 1}])
+
+    @app.post(API_PREFIX + "/sql/<statement_type>")
+    def sql(statement_type):
+        if statement_type != "dql":
+            return "[]"
+        limit = _limit.search(request_json()["sqlText"])
+        return result_response(int(limit.group(1)) if limit else rows)
+
+    @app.get(API_PREFIX + "/sql/views/<view_name>")
+    def view(view_name):
+        return result_response(rows)
+
+    return app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubGateway:
+    # Runs the stub gateway in a separate process, so its CPU and memory use never show
+    # up in the client side numbers.
+    def __init__(self, port=None, threads=32, **options):
+        self.port = port or free_port()
+        self.threads = threads
+        self.options = options
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def base_url(self):
+        return self.url + API_PREFIX
+
+    def start(self, timeout=15):
+        command = [sys.executable, os.path.abspath(__file__), "--port", str(self.port), "--threads", str(self.threads)]
+        for name, value in self.options.items():
+            option = f"--{name.replace('_', '-')}"
+            if isinstance(value, bool):
+                command += [option] if value else []
+            else:
+                command += [option, str(value)]
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                self.stats()
+                return self
+            except OSError:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"stub gateway exited with code {self.process.returncode}")
+                time.sleep(0.05)
+        self.stop()
+        raise RuntimeError(f"stub gateway did not start on port {self.port}")
+
+    def stats(self):
+        with urllib.request.urlopen(self.url + "/stats", timeout=5) as response:
+            return json.loads(response.read())
+
+    def reset_stats(self):
+        urllib.request.urlopen(urllib.request.Request(self.url + "/stats", method="DELETE"), timeout=5).close()
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Space and Time gateway.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--threads", type=int, default=32, help="waitress worker threads")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra delay of up to this much")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows returned by DQL and views")
+    parser.add_argument("--payload-bytes", type=int, default=DEFAULT_PAYLOAD_BYTES, help="size of the PAYLOAD column")
+    parser.add_argument("--token-ttl-ms", type=int, default=DEFAULT_TOKEN_TTL_MS)
+    parser.add_argument("--gzip-responses", action="store_true", help="gzip DQL and view results when the client accepts it")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="answer 429 beyond this many concurrent requests, 0 for no limit")
+    parser.add_argument("--retry-after", default=None, help="Retry-After value sent with 429 responses")
+    args = parser.parse_args()
+
+    from waitress import serve
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.rows, args.payload_bytes, args.token_ttl_ms, args.gzip_responses,
+                     args.max_in_flight, args.retry_after)
+    print(f"stub gateway on http://127.0.0.1:{args.port}{API_PREFIX}")
+    serve(app, host="127.0.0.1", port=args.port, threads=args.threads, _quiet=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import re
+
+from cache import TTLCache
+from validation import try_parse_identifier
+
+# Capabilities understood by the gateway, see authorize.datalog.
+CAPABILITIES = ("ddl_create", "ddl_alter", "ddl_drop", "dml_insert", "dml_update", "dml_delete", "dml_merge", "dql_select")
+
+DQL_SELECT = "dql_select"
+
+DEFAULT_BISCUIT_CACHE_SIZE = 1024
+
+# Capability needed by a statement, from its leading keyword.
+STATEMENT_CAPABILITIES = {
+    "CREATE": "ddl_create",
+    "ALTER": "ddl_alter",
+    "DROP": "ddl_drop",
+    "INSERT": "dml_insert",
+    "UPDATE": "dml_update",
+    "DELETE": "dml_delete",
+    "MERGE": "dml_merge",
+    "SELECT": "dql_select",
+    "WITH": "dql_select",
+}
+
+# Whitespace, comments and opening parentheses before the leading keyword of a statement.
+_statement_prefix = re.compile(r"(?:\s+|\(|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+
+_capability_fact = re.compile(r'sxt:capability\(\s*"([a-z_]+)"\s*,\s*"([^"]+)"\s*\)\s*;')
+
+
+def statement_capability(sql_text):
+    words = sql_text[_statement_prefix.match(sql_text).end():].split(None, 1)
+    return keyword_capability(words[0] if words else "")
+
+
+def keyword_capability(keyword):
+    keyword = keyword.upper()
+    capability = STATEMENT_CAPABILITIES.get(keyword)
+    if capability is None:
+        raise ValueError(f"Cannot tell the capability needed by statement starting with {keyword!r}")
+    return capability
+
+
+# Capability facts for one resource ID or a list of them.
+def capability_datalog(resource_ids, capabilities):
+    if isinstance(resource_ids, str):
+        resource_ids = [resource_ids]
+    return grant_datalog((resource_id, capability) for resource_id in resource_ids for capability in capabilities)
+
+
+# Capability facts for (resource ID, capability) pairs.
+def grant_datalog(grants):
+    facts = []
+    for resource_id, capability in grants:
+        schema_name, table_name = try_parse_identifier(resource_id)
+        resource = f"{schema_name}.{table_name}".lower()
+        if capability not in CAPABILITIES:
+            raise ValueError(f"Unknown capability {capability}, expected one of {', '.join(CAPABILITIES)}")
+        facts.append(f'sxt:capability("{capability}", "{resource}");')
+    return "\n".join(facts)
+
+
+# Returns the (capability, resource) facts of a datalog capability file such as authorize.datalog.
+def parse_datalog_capabilities(datalog_text):
+    return _capability_fact.findall(datalog_text)
+
+
+def private_key_bytes(private_key):
+    # Accepts the Base64 keys used for authentication as well as hex keys.
+    if re.fullmatch(r"[0-9a-fA-F]{64}", private_key):
+        return bytes.fromhex(private_key)
+    return base64.b64decode(private_key)
+
+
+class BiscuitMinter:
+    # Mints biscuits in process from datalog capability facts signed with the user's Ed25519 key.
+    # Minted biscuits are cached per (capability facts, key), so each table's biscuit is built
+    # once per process and reused by every request.
+    def __init__(self, maxsize=DEFAULT_BISCUIT_CACHE_SIZE):
+        self.biscuits = TTLCache(maxsize, float("inf"))
+
+    def mint_datalog(self, datalog, private_key):
+        key_bytes = private_key_bytes(private_key)
+        cache_key = (hashlib.sha256(datalog.encode()).hexdigest(), hashlib.sha256(key_bytes).hexdigest())
+        biscuit = self.biscuits.get(cache_key)
+        if biscuit is None:
+            # biscuit_auth is only imported when the first biscuit is minted.
+            from biscuit_auth import Algorithm, BiscuitBuilder, PrivateKey
+
+            root_key = PrivateKey.from_bytes(key_bytes, Algorithm.Ed25519)
+            biscuit = BiscuitBuilder(datalog).build(root_key).to_base64()
+            self.biscuits.set(cache_key, biscuit)
+        return biscuit
+
+    # Biscuit granting `capabilities` on one resource ID or a list of them.
+    def mint(self, resource_ids, capabilities, private_key):
+        return self.mint_datalog(capability_datalog(resource_ids, sorted(set(capabilities))), private_key)
+
+    # Biscuit granting each capability on its own resource, from (resource ID, capability) pairs.
+    def mint_grants(self, grants, private_key):
+        return self.mint_datalog(grant_datalog(sorted(set(grants))), private_key)
+
+    # Biscuit granting every capability fact of a datalog file such as authorize.datalog.
+    def mint_from_file(self, path, private_key):
+        with open(path) as file:
+            facts = parse_datalog_capabilities(file.read())
+        if not facts:
+            raise ValueError(f"No sxt:capability facts found in {path}")
+        datalog = "\n".join(f'sxt:capability("{capability}", "{resource}");' for capability, resource in sorted(set(facts)))
+        return self.mint_datalog(datalog, private_key)
+
+    def clear(self):
+        self.biscuits.clear()
+
+    def __len__(self):
+        return len(self.biscuits)
+
+
+# Minter shared by every SDK instance in the process.
+default_minter = BiscuitMinter()
@@ -0,0 +1,186 @@
+import datetime
+import decimal
+import json
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from validation import try_parse_identifier, is_valid_database_identifier
+
+# Upper bound for the JSON request body of one batch, kept well under the gateway payload limit.
+DEFAULT_MAX_PAYLOAD_BYTES = 512 * 1024
+DEFAULT_WORKERS = 4
+BULK_STATEMENTS = ("INSERT", "MERGE")
+
+# Room left in each batch for the rest of the JSON payload (resourceId, biscuits, keys).
+PAYLOAD_OVERHEAD_BYTES = 4 * 1024
+
+
+# pandas missing values (NaT, NA), without importing pandas for rows that did not come from it.
+def is_pandas_missing(value):
+    if not type(value).__module__.startswith("pandas"):
+        return False
+    import pandas as pd
+
+    return pd.isna(value) is True
+
+
+def sql_literal(value):
+    if is_pandas_missing(value):
+        return "NULL"
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        # NumPy scalars, e.g. from a DataFrame. A NaT datetime64 becomes None.
+        value = value.item()
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NULL"
+        if math.isinf(value):
+            raise ValueError(f"Cannot insert non-finite value {value}")
+        return repr(value)
+    if isinstance(value, decimal.Decimal) and not value.is_finite():
+        raise ValueError(f"Cannot insert non-finite value {value}")
+    if isinstance(value, (int, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return "'" + value.isoformat(sep=" ") + "'"
+    if isinstance(value, datetime.date):
+        return "'" + value.isoformat() + "'"
+    if isinstance(value, bytes):
+        return "X'" + value.hex() + "'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# Size of a piece of SQL text once it is JSON encoded in the request body.
+def encoded_size(sql_text):
+    return len(json.dumps(sql_text, ensure_ascii=False).encode("utf-8")) - 2
+
+
+# Returns (columns, iterator of value sequences) for dict rows, sequence rows or a pandas DataFrame.
+def normalize_rows(rows, columns=None):
+    if hasattr(rows, "itertuples") and hasattr(rows, "columns"):
+        # Selecting the columns keeps the values in the same order as the column list.
+        if columns:
+            rows = rows[list(columns)]
+        return list(rows.columns), rows.itertuples(index=False, name=None)
+
+    rows = iter(rows)
+    first_row = next(rows, None)
+    if first_row is None:
+        return list(columns or []), iter(())
+
+    if isinstance(first_row, dict):
+        columns = list(columns or first_row.keys())
+
+        def values():
+            yield [first_row.get(column) for column in columns]
+            for row in rows:
+                yield [row.get(column) for column in columns]
+
+        return columns, values()
+
+    if not columns:
+        raise ValueError("columns are required when rows are sequences")
+
+    def values():
+        yield first_row
+        yield from rows
+
+    return list(columns), values()
+
+
+def validate_columns(columns):
+    for column in columns:
+        if not is_valid_database_identifier(str(column).upper()):
+            raise ValueError(f"Invalid column identifier {column}")
+
+
+class BulkStatementBuilder:
+    # Packs rows into multi-row INSERT (or MERGE) statements whose JSON encoded size stays under max_payload_bytes.
+    def __init__(self, resource_id, columns, statement="INSERT", key_columns=None, max_payload_bytes=DEFAULT_MAX_PAYLOAD_BYTES):
+        if statement not in BULK_STATEMENTS:
+            raise ValueError(f"Unsupported bulk statement {statement}, expected one of {', '.join(BULK_STATEMENTS)}")
+        if statement == "MERGE" and not key_columns:
+            raise ValueError("key_columns are required for MERGE")
+
+        schema_name, table_name = try_parse_identifier(resource_id)
+        validate_columns(columns)
+        validate_columns(key_columns or [])
+
+        self.resource_id = f"{schema_name}.{table_name}"
+        self.columns = [str(column).upper() for column in columns]
+        self.statement = statement
+        self.key_columns = [str(column).upper() for column in key_columns or []]
+        self.max_payload_bytes = max_payload_bytes
+
+        self.prefix, self.suffix = self.statement_parts()
+        self.budget = max_payload_bytes - PAYLOAD_OVERHEAD_BYTES - encoded_size(self.prefix) - encoded_size(self.suffix)
+        if self.budget <= 0:
+            raise ValueError("max_payload_bytes is too small for the statement")
+
+    def statement_parts(self):
+        column_list = ", ".join(self.columns)
+        if self.statement == "INSERT":
+            return f"INSERT INTO {self.resource_id} ({column_list}) VALUES ", ""
+
+        on_clause = " AND ".join(f"TARGET.{column} = SOURCE.{column}" for column in self.key_columns)
+        update_columns = [column for column in self.columns if column not in self.key_columns]
+        update_clause = ""
+        if update_columns:
+            update_clause = " WHEN MATCHED THEN UPDATE SET " + ", ".join(f"{column} = SOURCE.{column}" for column in update_columns)
+        source_columns = ", ".join(f"SOURCE.{column}" for column in self.columns)
+        return (f"MERGE INTO {self.resource_id} AS TARGET USING (VALUES ",
+                f") AS SOURCE ({column_list}) ON {on_clause}{update_clause}"
+                f" WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({source_columns})")
+
+    def row_text(self, values):
+        if len(values) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values but got {len(values)}")
+        return "(" + ", ".join(sql_literal(value) for value in values) + ")"
+
+    # Yields (first_row_index, row_count, sql_text) batches.
+    def batches(self, value_rows):
+        batch = []
+        size = 0
+        first_row = 0
+        for index, values in enumerate(value_rows):
+            text = self.row_text(values)
+            text_size = encoded_size(text) + 2
+            if text_size > self.budget:
+                raise ValueError(f"Row {index} alone is larger than max_payload_bytes")
+            if batch and size + text_size > self.budget:
+                yield first_row, len(batch), self.prefix + ", ".join(batch) + self.suffix
+                batch = []
+                size = 0
+                first_row = index
+            batch.append(text)
+            size += text_size
+        if batch:
+            yield first_row, len(batch), self.prefix + ", ".join(batch) + self.suffix
+
+
+# Runs the DML batches on a thread pool and returns one result per batch in order.
+def run_batches(sdk, resource_id, biscuit, batches, workers=DEFAULT_WORKERS):
+    def run(batch_index, first_row, row_count, sql_text):
+        dml_data = sdk.DML(resource_id, sql_text, biscuit)
+        return {
+            "batch": batch_index,
+            "first_row": first_row,
+            "rows": row_count,
+            "response": dml_data["response"],
+            "error": dml_data["error"]
+        }
+
+    results = []
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch_index, (first_row, row_count, sql_text) in enumerate(batches):
+            pending.append(executor.submit(run, batch_index, first_row, row_count, sql_text))
+            if len(pending) >= workers:
+                results.append(pending.popleft().result())
+        while pending:
+            results.append(pending.popleft().result())
+    return results
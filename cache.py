@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    # Thread safe LRU cache whose entries expire individually.
+    # maxsize bounds the total size of the entries, each entry counting as getsizeof(value)
+    # (1 by default, so maxsize is then the number of entries). The least recently used
+    # entries are evicted first once the cache is full.
+    def __init__(self, maxsize, ttl, getsizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.getsizeof = getsizeof or (lambda value: 1)
+        self.entries = OrderedDict()
+        self.currsize = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at, size = entry
+            if expires_at <= time.time():
+                self.remove(key)
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    # Stores a value for `ttl` seconds (the cache default when not given).
+    # Values larger than maxsize are not cached.
+    def set(self, key, value, ttl=None, expires_at=None):
+        size = self.getsizeof(value)
+        if size > self.maxsize:
+            return
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (value, expires_at, size)
+            self.currsize += size
+            while self.currsize > self.maxsize:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        value, expires_at, size = self.entries.pop(key)
+        self.currsize -= size
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            self.remove(key)
+            return entry[0]
+
+    # Removes every entry whose key matches the predicate, returning how many were removed.
+    def discard(self, predicate):
+        with self.lock:
+            keys = [key for key in self.entries if predicate(key)]
+            for key in keys:
+                self.remove(key)
+            return len(keys)
+
+    # Unexpired (key, value, expires_at) entries, least recently used first.
+    def items(self):
+        now = time.time()
+        with self.lock:
+            return [(key, value, expires_at) for key, (value, expires_at, size) in self.entries.items() if expires_at > now]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.currsize = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
@@ -0,0 +1,83 @@
+import gzip
+import json
+
+# Codecs tried, in order, for "auto". orjson and ujson are optional dependencies, and neither
+# keeps integers wider than 64 bits exact (orjson decodes them as floats). Gateway results can
+# hold such values (uint256 amounts in wei), so stdlib json is the default.
+PREFERRED_CODECS = ("orjson", "ujson", "json")
+
+COMPRESS_LEVEL = 5
+
+
+class StdlibCodec:
+    name = "json"
+
+    def dumps(self, value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+
+    def dumps(self, value):
+        return self.orjson.dumps(value)
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+
+class UjsonCodec:
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self.ujson = ujson
+
+    def dumps(self, value):
+        return self.ujson.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return self.ujson.loads(data)
+
+
+CODECS = {"json": StdlibCodec, "orjson": OrjsonCodec, "ujson": UjsonCodec}
+
+
+# Returns a codec by name, stdlib json for None, or the fastest installed one for "auto".
+# Any object with dumps(value) -> bytes and loads(bytes or str) methods can be passed as is.
+def get_codec(codec=None):
+    if codec is None:
+        return StdlibCodec()
+    if codec == "auto":
+        for name in PREFERRED_CODECS:
+            try:
+                return CODECS[name]()
+            except ImportError:
+                continue
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown JSON codec {codec}, expected one of {', '.join(CODECS)}")
+        return CODECS[codec]()
+    return codec
+
+
+# Encodes a JSON request body, gzip compressing it when it is at least compress_min_bytes long.
+# Returns the body and a copy of the headers with its content type and encoding.
+def encode_json_body(codec, value, headers=None, compress_min_bytes=None):
+    body = codec.dumps(value)
+    headers = dict(headers or {})
+    if not any(name.lower() == "content-type" for name in headers):
+        headers["content-type"] = "application/json"
+    if compress_min_bytes is not None and len(body) >= compress_min_bytes:
+        body = gzip.compress(body, COMPRESS_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
@@ -0,0 +1,94 @@
+# Decodes row oriented gateway results into one typed NumPy array per column.
+# numpy and pandas are only imported when a columnar result is requested.
+
+SQL_TYPE_DTYPES = {
+    "TINYINT": "int8",
+    "SMALLINT": "int16",
+    "INT": "int32",
+    "INTEGER": "int32",
+    "BIGINT": "int64",
+    "REAL": "float32",
+    "FLOAT": "float64",
+    "DOUBLE": "float64",
+    # Decimals can be wider than a float64 holds exactly (e.g. uint256 amounts), so they keep the decoded values.
+    "DECIMAL": "object",
+    "NUMERIC": "object",
+    "BOOLEAN": "bool",
+    "DATE": "datetime64[D]",
+    "TIMESTAMP": "datetime64[ms]",
+    "VARCHAR": "object",
+    "CHAR": "object",
+    "TEXT": "object",
+    "BINARY": "object",
+    "VARBINARY": "object",
+}
+
+
+# Returns the NumPy dtype for an SQL type such as "DECIMAL(18, 2)", or None when it is unknown.
+def dtype_for(sql_type):
+    if not sql_type:
+        return None
+    return SQL_TYPE_DTYPES.get(sql_type.upper().split("(")[0].strip())
+
+
+# Maps upper cased column names to their SQL types from a get_table_columns() response.
+def column_types_from_metadata(columns_metadata):
+    return {column["column"].upper(): column["dataType"] for column in columns_metadata if column.get("column")}
+
+
+# pandas nullable dtype of an integer or boolean NumPy dtype, e.g. "Int64" for "int64".
+def nullable_dtype(dtype):
+    return "boolean" if dtype == "bool" else dtype.capitalize()
+
+
+def to_array(np, values, dtype, nullable=False):
+    if dtype is None:
+        array = np.array(values)
+        return array if array.dtype.kind not in "USV" else np.array(values, dtype=object)
+
+    kind = np.dtype(dtype).kind
+    if kind in "iub" and any(value is None for value in values):
+        # Integers and booleans with NULLs keep their exact values, in a pandas nullable array for
+        # a DataFrame and as Python objects otherwise.
+        if nullable:
+            import pandas as pd
+
+            try:
+                return pd.array(values, dtype=nullable_dtype(dtype))
+            except (TypeError, ValueError, OverflowError):
+                pass
+        dtype = object
+
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError, OverflowError):
+        return np.array(values, dtype=object)
+
+
+# Consumes an iterable of row objects and returns {column name: ndarray} in result column order.
+# Rows are appended straight into per column buffers, so with a streamed result no list of
+# per row dicts is ever built. column_types maps upper cased column names to SQL types;
+# columns without a known type get the dtype NumPy infers from their values. With nullable=True
+# integer and boolean columns holding NULLs become pandas nullable arrays instead of object arrays.
+def build_columns(rows, column_types=None, nullable=False):
+    import numpy as np
+
+    column_types = column_types or {}
+    buffers = None
+    for row in rows:
+        if buffers is None:
+            buffers = {name: [] for name in row}
+        for name, buffer in buffers.items():
+            buffer.append(row.get(name))
+
+    if buffers is None:
+        return {}
+
+    return {name: to_array(np, buffer, dtype_for(column_types.get(name.upper())), nullable)
+            for name, buffer in buffers.items()}
+
+
+def to_dataframe(columns):
+    import pandas as pd
+
+    return pd.DataFrame(columns, copy=False)
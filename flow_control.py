@@ -0,0 +1,324 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from instrumentation import endpoint_class
+from transport import IDEMPOTENT_METHODS
+
+# Statuses telling the client to send less: rejected for rate limiting, or temporarily unavailable.
+OVERLOAD_STATUS_CODES = (429, 503)
+
+# Views run SQL on the gateway, so they share the SQL limit.
+ENDPOINT_CLASSES = {"views": "sql"}
+
+DEFAULT_INITIAL_LIMIT = 16
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 256
+DEFAULT_DECREASE_FACTOR = 0.7
+DEFAULT_ACQUIRE_TIMEOUT = 60
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_BASE = 0.25
+DEFAULT_BACKOFF_CAP = 20
+DEFAULT_MAX_RETRY_AFTER = 60
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 5
+MAX_RESET_TIMEOUT = 120
+
+# How often a coroutine waiting for a free slot checks the limit again.
+ASYNC_POLL_SECONDS = 0.005
+
+
+class GatewayUnavailableError(requests.exceptions.RequestException):
+    # Raised without calling the gateway while the circuit breaker of an endpoint class is open.
+    pass
+
+
+class ConcurrencyLimitTimeout(requests.exceptions.RequestException):
+    pass
+
+
+def retry_after_seconds(headers, now=None):
+    # Retry-After is either a number of seconds or an HTTP date.
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (time.time() if now is None else now))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt, base=DEFAULT_BACKOFF_BASE, cap=DEFAULT_BACKOFF_CAP):
+    # Exponential backoff with full jitter, so throttled clients do not retry in lockstep.
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    # AIMD concurrency limit: every successful call raises the limit by 1 / limit (about one
+    # more slot per round trip of the whole window), an overloaded call multiplies it by
+    # decrease_factor. A burst of overload responses from calls sent together only counts
+    # once, as decreases are at most one per window of calls, which keeps the limit close to
+    # what the gateway sustains instead of collapsing it to the minimum.
+    def __init__(self, initial_limit=DEFAULT_INITIAL_LIMIT, min_limit=DEFAULT_MIN_LIMIT,
+                 max_limit=DEFAULT_MAX_LIMIT, decrease_factor=DEFAULT_DECREASE_FACTOR):
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.started = 0
+        self.last_decrease = -1
+        self.condition = threading.Condition()
+
+    def try_acquire(self):
+        with self.condition:
+            if self.in_flight >= int(self.limit):
+                return None
+            return self.take()
+
+    # Waits for a free slot and returns a ticket for release().
+    def acquire(self, timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                raise ConcurrencyLimitTimeout(f"No free request slot after {timeout}s (limit {int(self.limit)})")
+            return self.take()
+
+    def take(self):
+        self.in_flight += 1
+        self.started += 1
+        return self.started
+
+    def release(self, ticket, overloaded=False):
+        with self.condition:
+            self.in_flight -= 1
+            if overloaded:
+                # Calls started before the last decrease saw the old limit, they do not lower it again.
+                if ticket > self.last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self.last_decrease = self.started
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive failures (connection errors, timeouts, 5xx) and
+    # fails calls fast while open. After reset_timeout one trial call is let through: success
+    # closes the breaker, failure opens it again for twice as long, up to MAX_RESET_TIMEOUT.
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_until = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_until is None:
+            return "closed"
+        return "half-open" if time.monotonic() >= self.opened_until else "open"
+
+    # Returns the seconds left before calls are allowed again, 0 when this call may go ahead.
+    def check(self):
+        with self.lock:
+            if self.opened_until is None:
+                return 0
+            remaining = self.opened_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self.trial_running:
+                return self.reset_timeout
+            self.trial_running = True
+            return 0
+
+    def record(self, failed):
+        with self.lock:
+            if not failed:
+                self.failures = 0
+                self.opened_until = None
+                self.trial_running = False
+                self.reset_timeout = self.base_reset_timeout
+                return
+            self.failures += 1
+            if self.trial_running:
+                self.trial_running = False
+                self.reset_timeout = min(MAX_RESET_TIMEOUT, self.reset_timeout * 2)
+                self.opened_until = time.monotonic() + self.reset_timeout
+            elif self.failures >= self.failure_threshold:
+                self.opened_until = time.monotonic() + self.reset_timeout
+
+    # A call ended without an outcome (cancelled, or failed in the client). If it was the trial
+    # call, the next call becomes the trial instead.
+    def abandon(self):
+        with self.lock:
+            self.trial_running = False
+
+
+class EndpointGate:
+    # Limiter, circuit breaker and Retry-After pause of one endpoint class.
+    def __init__(self, name, flow_control):
+        self.name = name
+        self.flow_control = flow_control
+        self.limiter = AdaptiveLimiter(flow_control.initial_limit, flow_control.min_limit,
+                                       flow_control.max_limit, flow_control.decrease_factor)
+        self.breaker = CircuitBreaker(flow_control.failure_threshold, flow_control.reset_timeout)
+        self.paused_until = 0.0
+
+    def check_breaker(self):
+        remaining = self.breaker.check()
+        if remaining:
+            raise GatewayUnavailableError(f"Gateway {self.name} endpoints are failing, not retrying for {remaining:.1f}s")
+
+    def pause_remaining(self):
+        return max(0.0, self.paused_until - time.monotonic())
+
+    def enter(self):
+        self.check_breaker()
+        pause = self.pause_remaining()
+        if pause:
+            time.sleep(pause)
+        return self.limiter.acquire(self.flow_control.acquire_timeout)
+
+    async def enter_async(self):
+        self.check_breaker()
+        pause = self.pause_remaining()
+        if pause:
+            await asyncio.sleep(pause)
+        deadline = time.monotonic() + self.flow_control.acquire_timeout
+        while True:
+            ticket = self.limiter.try_acquire()
+            if ticket is not None:
+                return ticket
+            if time.monotonic() >= deadline:
+                raise ConcurrencyLimitTimeout(f"No free request slot after {self.flow_control.acquire_timeout}s (limit {int(self.limiter.limit)})")
+            await asyncio.sleep(ASYNC_POLL_SECONDS)
+
+    # Records the outcome of a call. Returns whether the gateway was overloaded, and the delay
+    # before retrying it or None when it should not be retried. `error` is set when no
+    # response arrived (connection error or timeout).
+    def complete(self, method, status, headers, error, attempt):
+        overloaded = error is not None or status in OVERLOAD_STATUS_CODES
+        self.breaker.record(error is not None or (status is not None and status >= 500))
+
+        if error is not None or status not in OVERLOAD_STATUS_CODES:
+            return overloaded, None
+
+        retry_after = retry_after_seconds(headers)
+        if retry_after is not None:
+            retry_after = min(retry_after, self.flow_control.max_retry_after)
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+        # A 429 was rejected before it ran, a 503 may have run, so only idempotent calls repeat it.
+        retryable = status == 429 or method.upper() in IDEMPOTENT_METHODS
+        if not retryable or attempt + 1 >= self.flow_control.max_attempts:
+            return overloaded, None
+        return overloaded, retry_after if retry_after is not None else self.flow_control.backoff(attempt)
+
+    # Releases the slot of a call that ended without an outcome, see CircuitBreaker.abandon().
+    def abandon(self, ticket):
+        self.breaker.abandon()
+        self.limiter.release(ticket)
+
+    def stats(self):
+        return {
+            "limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "breaker": self.breaker.state,
+            "paused_for": round(self.pause_remaining(), 3)
+        }
+
+
+class FlowControl:
+    # Client side flow control per endpoint class (auth, discover, sql): an adaptive concurrency
+    # limit, a circuit breaker, and retries of throttled (429) and unavailable (503) calls after
+    # Retry-After or a jittered exponential backoff. One FlowControl can be shared by several
+    # SDK instances talking to the same gateway.
+    def __init__(self, initial_limit=DEFAULT_INITIAL_LIMIT, min_limit=DEFAULT_MIN_LIMIT, max_limit=DEFAULT_MAX_LIMIT,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_base=DEFAULT_BACKOFF_BASE, backoff_cap=DEFAULT_BACKOFF_CAP,
+                 max_retry_after=DEFAULT_MAX_RETRY_AFTER, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.acquire_timeout = acquire_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.gates = {}
+        self.lock = threading.Lock()
+
+    def backoff(self, attempt):
+        return backoff_seconds(attempt, self.backoff_base, self.backoff_cap)
+
+    def gate(self, path):
+        name = endpoint_class(path)
+        name = ENDPOINT_CLASSES.get(name, name)
+        gate = self.gates.get(name)
+        if gate is None:
+            with self.lock:
+                gate = self.gates.setdefault(name, EndpointGate(name, self))
+        return gate
+
+    # Sends a request with `send()` under the endpoint's limit, retrying it while it is throttled.
+    # A streamed response keeps its slot until it is closed.
+    def call(self, method, path, send, stream=False):
+        gate = self.gate(path)
+        attempt = 0
+        while True:
+            ticket = gate.enter()
+            try:
+                response = send()
+            except requests.exceptions.RequestException as error:
+                # No complete response arrived: the connection failed, timed out or broke mid-body.
+                gate.complete(method, None, None, error, attempt)
+                gate.limiter.release(ticket, overloaded=True)
+                raise
+            except BaseException:
+                gate.abandon(ticket)
+                raise
+
+            overloaded, delay = gate.complete(method, response.status_code, response.headers, None, attempt)
+            if delay is not None:
+                response.close()
+                gate.limiter.release(ticket, overloaded)
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if not stream:
+                gate.limiter.release(ticket, overloaded)
+                return response
+
+            close = response.close
+            released = []
+
+            def close_and_release():
+                close()
+                if not released:
+                    released.append(True)
+                    gate.limiter.release(ticket, overloaded)
+
+            response.close = close_and_release
+            return response
+
+    def stats(self):
+        with self.lock:
+            gates = dict(self.gates)
+        return {name: gate.stats() for name, gate in gates.items()}
@@ -0,0 +1,227 @@
+import time
+from contextvars import ContextVar
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Paths that carry a user ID or view name are reported under their route so that
+# metrics keep a bounded set of endpoint labels.
+PARAMETERIZED_ROUTES = ("/auth/idexists/", "/sql/views/")
+
+DEFAULT_METRICS_NAMESPACE = "sxt_sdk"
+
+# Time spent by the calling thread (or asyncio task) before its next request: opening connections
+# and waiting on token renewals. Both are picked up by the request it sends next.
+_pending = {
+    "connect": ContextVar("sxt_pending_connect", default=0.0),
+    "token_wait": ContextVar("sxt_pending_token_wait", default=0.0),
+}
+
+
+def add_pending(name, seconds):
+    _pending[name].set(_pending[name].get() + seconds)
+
+
+def take_pending(name):
+    seconds = _pending[name].get()
+    if seconds:
+        _pending[name].set(0.0)
+    return seconds
+
+
+# Records the time a caller spent waiting on a token renewal.
+def record_token_wait(seconds):
+    add_pending("token_wait", seconds)
+
+
+def endpoint_label(path):
+    path = path.split("?", 1)[0]
+    if path.startswith(("http://", "https://")):
+        path = "/" + path.split("/", 3)[-1]
+    for route in PARAMETERIZED_ROUTES:
+        if path.startswith(route):
+            return route.rstrip("/")
+    return path
+
+
+# Endpoint group of a gateway path: auth, discover, sql or views.
+def endpoint_class(path):
+    label = endpoint_label(path)
+    if label == "/sql/views":
+        return "views"
+    return label.strip("/").split("/", 1)[0] or "other"
+
+
+class RequestEvent:
+    # Timings (in seconds) and sizes (in bytes) of one gateway call. `ttfb` runs from sending
+    # the request until the response headers arrive and includes `connect`; `download` is the
+    # time spent reading the body.
+    def __init__(self, method, path):
+        self.method = method
+        self.endpoint = endpoint_label(path)
+        self.endpoint_class = endpoint_class(path)
+        self.status = None
+        self.error = None
+        self.started = time.time()
+        self.connect = 0.0
+        self.ttfb = 0.0
+        self.download = 0.0
+        self.total = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.token_wait = take_pending("token_wait")
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"RequestEvent({self.method} {self.endpoint} {self.status} {self.total * 1000:.1f}ms)"
+
+
+class Instrumentation:
+    # Hook list shared by the sync and async transports. A hook is either a callable, called
+    # with each finished RequestEvent, or an object with optional on_request(event) and
+    # on_response(event) methods called before the request is sent and once it is done.
+    # Hooks must not raise; an exception in a hook is dropped rather than failing the call.
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+
+    def add(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove(self, hook):
+        self.hooks.remove(hook)
+
+    def __bool__(self):
+        return bool(self.hooks)
+
+    def start(self, method, path):
+        event = RequestEvent(method, path)
+        take_pending("connect")
+        self.notify("on_request", event)
+        return event
+
+    def finish(self, event, started):
+        event.total = time.perf_counter() - started
+        self.notify("on_response", event)
+
+    def notify(self, name, event):
+        for hook in self.hooks:
+            callback = getattr(hook, name, None)
+            if callback is None and name == "on_response" and callable(hook):
+                callback = hook
+            if callback is None:
+                continue
+            try:
+                callback(event)
+            except Exception:
+                pass
+
+
+def request_size(prepared):
+    body = getattr(prepared, "body", None)
+    if body is None:
+        return 0
+    return len(body.encode("utf-8") if isinstance(body, str) else body)
+
+
+def retry_count(response):
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+
+# Bytes received on the wire, before decompression. urllib3 does not count the bytes of chunked
+# responses, their size is then the decoded `received` bytes.
+def wire_size(response, received):
+    try:
+        return response.raw.tell() or received
+    except Exception:
+        return received
+
+
+# Connection classes that add the TCP (and TLS) setup time to the calling thread's pending connect time.
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            add_pending("connect", time.perf_counter() - started)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            add_pending("connect", time.perf_counter() - started)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    # HTTPAdapter whose pooled connections report how long they took to open.
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+class PrometheusExporter:
+    # Hook that exports request events to prometheus_client collectors:
+    #   <namespace>_requests_total{endpoint,method,status}
+    #   <namespace>_request_seconds{endpoint,method}           total latency
+    #   <namespace>_request_phase_seconds{endpoint,phase}      connect, ttfb and download
+    #   <namespace>_request_bytes{endpoint,direction}          sent and received payload sizes
+    #   <namespace>_retries_total{endpoint}
+    #   <namespace>_token_wait_seconds                         time callers waited on token renewal
+    #   <namespace>_errors_total{endpoint,error}
+    # Collectors are registered on `registry` (the prometheus_client default registry if None).
+    def __init__(self, registry=None, namespace=DEFAULT_METRICS_NAMESPACE):
+        # prometheus_client is only imported when an exporter is created.
+        from prometheus_client import REGISTRY, Counter, Histogram
+
+        registry = REGISTRY if registry is None else registry
+        self.registry = registry
+        self.requests = Counter("requests_total", "Gateway requests", ["endpoint", "method", "status"], namespace=namespace, registry=registry)
+        self.latency = Histogram("request_seconds", "Gateway request latency", ["endpoint", "method"], namespace=namespace, registry=registry)
+        self.phases = Histogram("request_phase_seconds", "Gateway request latency by phase", ["endpoint", "phase"], namespace=namespace, registry=registry)
+        self.payloads = Histogram(
+            "request_bytes", "Gateway request and response payload sizes", ["endpoint", "direction"],
+            namespace=namespace, registry=registry,
+            buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864, float("inf"))
+        )
+        self.retries = Counter("retries_total", "Gateway request retries", ["endpoint"], namespace=namespace, registry=registry)
+        self.token_waits = Histogram("token_wait_seconds", "Time callers waited on a token renewal", namespace=namespace, registry=registry)
+        self.errors = Counter("errors_total", "Gateway requests that failed without a response", ["endpoint", "error"], namespace=namespace, registry=registry)
+
+    def __call__(self, event):
+        status = str(event.status) if event.status is not None else "error"
+        self.requests.labels(event.endpoint, event.method, status).inc()
+        self.latency.labels(event.endpoint, event.method).observe(event.total)
+        self.phases.labels(event.endpoint, "connect").observe(event.connect)
+        self.phases.labels(event.endpoint, "ttfb").observe(event.ttfb)
+        self.phases.labels(event.endpoint, "download").observe(event.download)
+        self.payloads.labels(event.endpoint, "sent").observe(event.request_bytes)
+        self.payloads.labels(event.endpoint, "received").observe(event.response_bytes)
+        if event.retries:
+            self.retries.labels(event.endpoint).inc(event.retries)
+        if event.token_wait:
+            self.token_waits.observe(event.token_wait)
+        if event.error is not None:
+            self.errors.labels(event.endpoint, type(event.error).__name__).inc()
+
+    # Serves the registry on http://<addr>:<port>/metrics from a daemon thread.
+    def serve(self, port, addr="0.0.0.0"):
+        from prometheus_client import start_http_server
+
+        return start_http_server(port, addr=addr, registry=self.registry)
@@ -1,12 +1,18 @@
-
-import ed25519
 import binascii
 import base64
+import json
 import os
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+import threading
+
+# Path of a JSON key store holding b64_private_key and b64_public_key.
+# When set, keys are loaded from it instead of being generated on every start.
+KEYSTORE_ENV = "KEYSTORE"
 
 def generate_keys():
+    # cryptography is only imported when keys are actually generated.
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
     seed = os.urandom(32)
     private_key = Ed25519PrivateKey.from_private_bytes(seed)
     public_key = private_key.public_key()
@@ -41,4 +47,56 @@ def generate_keys():
     return generated_keys
 
 
-exported_keys = generate_keys()
\ No newline at end of file
+# Builds the same key object as generate_keys() from Base64 encoded keys.
+def keys_from_b64(b64_private_key, b64_public_key):
+    private_key_bytes = base64.b64decode(b64_private_key)
+    public_key_bytes = base64.b64decode(b64_public_key)
+
+    return {
+        "ed25519_private_key": private_key_bytes,
+        "ed25519_public_key": public_key_bytes,
+        "b64_private_key": b64_private_key,
+        "b64_public_key": b64_public_key,
+        "hex_private_key": binascii.hexlify(private_key_bytes).decode(),
+        "hex_public_key": binascii.hexlify(public_key_bytes).decode(),
+    }
+
+def load_keys(path):
+    with open(path) as file:
+        stored_keys = json.load(file)
+    return keys_from_b64(stored_keys["b64_private_key"], stored_keys["b64_public_key"])
+
+# The key store holds the private key, so it is only readable by its owner.
+def save_keys(path, keys):
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    if hasattr(os, "fchmod"):
+        # An existing file keeps its mode on open.
+        os.fchmod(descriptor, 0o600)
+    with os.fdopen(descriptor, "w") as file:
+        json.dump({"b64_private_key": keys["b64_private_key"], "b64_public_key": keys["b64_public_key"]}, file)
+
+
+_exported_keys = None
+_exported_keys_lock = threading.Lock()
+
+# Returns the process wide keys, loading them from the configured key store or generating them on first use.
+# A configured key store that does not exist yet is created with freshly generated keys.
+def get_exported_keys():
+    global _exported_keys
+    if _exported_keys is None:
+        with _exported_keys_lock:
+            if _exported_keys is None:
+                keystore_path = os.getenv(KEYSTORE_ENV)
+                if keystore_path and os.path.exists(keystore_path):
+                    _exported_keys = load_keys(keystore_path)
+                else:
+                    _exported_keys = generate_keys()
+                    if keystore_path:
+                        save_keys(keystore_path, _exported_keys)
+    return _exported_keys
+
+# `from keygen import exported_keys` keeps working, the keys are only created when it is first accessed.
+def __getattr__(name):
+    if name == "exported_keys":
+        return get_exported_keys()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
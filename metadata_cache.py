@@ -0,0 +1,91 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TTLCache
+
+DEFAULT_METADATA_TTL = 300
+DEFAULT_METADATA_MAXSIZE = 4096
+DEFAULT_PREFETCH_WORKERS = 8
+
+
+def cache_key(api_endpoint, params=None):
+    return (api_endpoint, tuple(sorted((params or {}).items())))
+
+
+class MetadataCache:
+    # Caches discovery responses per (endpoint, query parameters) with a TTL per entry and
+    # LRU eviction once maxsize entries are held. Entries can be written to a JSON snapshot
+    # and loaded back on start so a restarted process begins with a warm cache.
+    def __init__(self, ttl=DEFAULT_METADATA_TTL, maxsize=DEFAULT_METADATA_MAXSIZE, snapshot_path=None):
+        self.entries = TTLCache(maxsize, ttl)
+        self.snapshot_path = snapshot_path
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot(snapshot_path)
+
+    def get(self, api_endpoint, params=None):
+        return self.entries.get(cache_key(api_endpoint, params))
+
+    def set(self, api_endpoint, params, response, ttl=None):
+        self.entries.set(cache_key(api_endpoint, params), response, ttl)
+
+    # Drops everything cached about a table: its own metadata, the namespace wide listings
+    # (tables, relations, key references) of its namespace and the namespace list.
+    def invalidate_resource(self, namespace, table_name=None):
+        namespace = namespace.upper()
+        table_name = table_name.upper() if table_name else None
+
+        def stale(key):
+            api_endpoint, params = key
+            params = dict(params)
+            if api_endpoint == "/discover/namespace":
+                return True
+            if params.get("namespace") != namespace:
+                return False
+            return table_name is None or "table" not in params or api_endpoint.startswith("/discover/refs") or params["table"] == table_name
+
+        return self.entries.discard(stale)
+
+    def clear(self):
+        self.entries.clear()
+
+    def save_snapshot(self, path=None):
+        path = path or self.snapshot_path
+        snapshot = [[api_endpoint, params, response, expires_at]
+                    for (api_endpoint, params), response, expires_at in self.entries.items()]
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(temporary_path, path)
+
+    # Loads unexpired entries from a snapshot, keeping their original expiry times.
+    def load_snapshot(self, path=None):
+        path = path or self.snapshot_path
+        with open(path) as file:
+            snapshot = json.load(file)
+        for api_endpoint, params, response, expires_at in snapshot:
+            key = (api_endpoint, tuple(tuple(param) for param in params))
+            self.entries.set(key, response, expires_at=expires_at)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# Loads the tables of a namespace and, for every table, its columns, indexes and primary keys
+# concurrently, filling the SDK's metadata cache. Returns the list of table names.
+def prefetch_namespace(sdk, namespace, scope="ALL", workers=DEFAULT_PREFETCH_WORKERS):
+    tables_data = sdk.get_tables(scope, namespace)
+    if tables_data["error"]:
+        raise Exception(tables_data["error"])
+    table_names = [table["table"] for table in sdk.codec.loads(tables_data["response"])]
+
+    calls = [(sdk.get_table_relationships, (scope, namespace))]
+    for table_name in table_names:
+        calls.append((sdk.get_table_columns, (table_name, namespace)))
+        calls.append((sdk.get_table_indexes, (table_name, namespace)))
+        calls.append((sdk.get_table_primary_keys, (table_name, namespace)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda call: call[0](*call[1]), calls))
+
+    return table_names
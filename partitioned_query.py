@@ -0,0 +1,143 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from bulk_insert import sql_literal
+from validation import try_parse_identifier, is_valid_database_identifier
+
+DEFAULT_WORKERS = 4
+DEFAULT_PAGE_SIZE = 10000
+PARTITION_MODES = ("range", "keyset")
+
+
+class PartitionQueryError(Exception):
+    def __init__(self, partition, error):
+        super().__init__(f"Partition {partition} failed: {error}")
+        self.partition = partition
+        self.error = error
+
+
+# First primary key column of a table from get_table_primary_keys().
+def primary_key_column(sdk, resource_id):
+    schema_name, table_name = try_parse_identifier(resource_id)
+    primary_keys_data = sdk.get_table_primary_keys(table_name, schema_name)
+    if primary_keys_data["error"]:
+        raise PartitionQueryError("primary key lookup", primary_keys_data["error"])
+    primary_keys = sorted(sdk.codec.loads(primary_keys_data["response"]), key=lambda key: key.get("position", 0))
+    if not primary_keys:
+        raise ValueError(f"{resource_id} has no primary key, pass key_column explicitly")
+    return primary_keys[0]["column"]
+
+
+# Splits the inclusive integer range [low, high] into at most `partitions` contiguous (start, end) ranges.
+def key_ranges(low, high, partitions):
+    span = high - low + 1
+    partitions = max(1, min(partitions, span))
+    step, remainder = divmod(span, partitions)
+    ranges = []
+    start = low
+    for index in range(partitions):
+        end = start + step + (1 if index < remainder else 0) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def range_sql(sql_text, key_column, start, end):
+    return f"SELECT * FROM ({sql_text}) AS PARTITION_QUERY WHERE {key_column} >= {start} AND {key_column} <= {end} ORDER BY {key_column}"
+
+
+def keyset_sql(sql_text, key_column, last_key, page_size):
+    where = "" if last_key is None else f" WHERE {key_column} > {sql_literal(last_key)}"
+    return f"SELECT * FROM ({sql_text}) AS PARTITION_QUERY{where} ORDER BY {key_column} LIMIT {page_size}"
+
+
+def run_dql(sdk, resource_id, sql_text, biscuit, partition):
+    dql_data = sdk.DQL(resource_id, sql_text, biscuit)
+    if dql_data["error"]:
+        raise PartitionQueryError(partition, dql_data["error"])
+    return sdk.codec.loads(dql_data["response"])
+
+
+def key_bounds(sdk, resource_id, sql_text, biscuit, key_column):
+    bounds_sql = f"SELECT MIN({key_column}) AS LOW_KEY, MAX({key_column}) AS HIGH_KEY FROM ({sql_text}) AS PARTITION_QUERY"
+    rows = run_dql(sdk, resource_id, bounds_sql, biscuit, "bounds")
+    if not rows:
+        return None, None
+    low, high = list(rows[0].values())
+    return low, high
+
+
+# Runs one DQL per key range on a thread pool and yields the rows.
+# With ordered=True partitions are yielded in key order, otherwise as soon as each one completes.
+# At most `workers` partitions are in flight or buffered at a time, so memory stays bounded.
+def iter_range_partitions(sdk, resource_id, sql_text, biscuit, key_column, ranges, workers, ordered):
+    partition_sqls = iter(enumerate(range_sql(sql_text, key_column, start, end) for start, end in ranges))
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            partition = next(partition_sqls, None)
+            if partition is not None:
+                index, partition_sql = partition
+                pending.append(executor.submit(run_dql, sdk, resource_id, partition_sql, biscuit, index))
+
+        for _ in range(workers):
+            submit_next()
+
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            rows = future.result()
+            submit_next()
+            yield from rows
+
+
+# Value of the key column in a result row, whatever the case of the returned column names.
+# Without it the next page could not start after this one.
+def row_key(row, key_column, page):
+    for name, value in row.items():
+        if name.upper() == key_column.upper():
+            if value is None:
+                raise PartitionQueryError(page, f"Key column {key_column} is NULL in the last row of the page")
+            return value
+    raise PartitionQueryError(page, f"Key column {key_column} is not in the result, select it to page through keys")
+
+
+# Pages through the result in key order, each page starting after the last key of the previous one.
+# Works for any orderable key but the pages depend on each other, so they run one after another.
+def iter_keyset_pages(sdk, resource_id, sql_text, biscuit, key_column, page_size):
+    last_key = None
+    page = 0
+    while True:
+        rows = run_dql(sdk, resource_id, keyset_sql(sql_text, key_column, last_key, page_size), biscuit, page)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_key = row_key(rows[-1], key_column, page)
+        page += 1
+
+
+def partitioned_rows(sdk, resource_id, sql_text, biscuit, key_column=None, partitions=None,
+                     workers=DEFAULT_WORKERS, ordered=True, mode="range", page_size=DEFAULT_PAGE_SIZE):
+    if mode not in PARTITION_MODES:
+        raise ValueError(f"Unsupported partition mode {mode}, expected one of {', '.join(PARTITION_MODES)}")
+
+    key_column = str(key_column or primary_key_column(sdk, resource_id)).upper()
+    if not is_valid_database_identifier(key_column):
+        raise ValueError(f"Invalid key column {key_column}")
+
+    if mode == "keyset":
+        return iter_keyset_pages(sdk, resource_id, sql_text, biscuit, key_column, page_size)
+
+    low, high = key_bounds(sdk, resource_id, sql_text, biscuit, key_column)
+    if low is None:
+        return iter(())
+    if not isinstance(low, int) or not isinstance(high, int):
+        raise ValueError(f"Range partitioning needs an integer key but {key_column} is not, use mode=\"keyset\"")
+
+    ranges = key_ranges(low, high, partitions or workers * 4)
+    return iter_range_partitions(sdk, resource_id, sql_text, biscuit, key_column, ranges, workers, ordered)
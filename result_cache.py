@@ -0,0 +1,125 @@
+import hashlib
+import json
+import re
+import threading
+
+from cache import TTLCache
+from sql_router import classify
+
+DEFAULT_RESULT_TTL = 30
+DEFAULT_RESULT_MAX_BYTES = 64 * 1024 * 1024
+
+# View results, and DQL results whose tables cannot be told, are cached under this resource since
+# the tables they read are not known. Every write invalidates it.
+VIEW_RESOURCE = "#VIEWS"
+
+_string_literal = re.compile(r"('(?:[^']|'')*')")
+_whitespace = re.compile(r"\s+")
+
+
+# Collapses whitespace and upper cases SQL text outside string literals,
+# so statements that only differ in formatting share a cache entry.
+def normalize_sql(sql_text):
+    parts = _string_literal.split(sql_text.strip().rstrip(";").strip())
+    return "".join(part if index % 2 else _whitespace.sub(" ", part).upper() for index, part in enumerate(parts))
+
+
+def biscuit_scope(biscuit):
+    return hashlib.sha256((biscuit or "").encode()).hexdigest()
+
+
+# Tables a DQL statement reads, the resources its cached result is invalidated by.
+def read_resources(resource_id, sql_text):
+    try:
+        tables = classify(sql_text).resources
+    except ValueError:
+        tables = (VIEW_RESOURCE,)
+    return tuple(dict.fromkeys((resource_id.upper(),) + tables))
+
+
+# Identifies a DQL read: requests with the same key return the same rows.
+# The first item holds the resources the result depends on.
+def dql_key(resource_id, sql_text, identity, biscuit, row_count=0):
+    return (read_resources(resource_id, sql_text), normalize_sql(sql_text), row_count, identity, biscuit_scope(biscuit))
+
+
+# Identifies a set of view parameters regardless of the key order of each parameter.
+# Parameter values may be lists or objects, so the set is keyed on its canonical JSON.
+def parameters_key(parameters_request):
+    return json.dumps(parameters_request or [], sort_keys=True, separators=(",", ":"), default=str)
+
+
+def view_key(view_name, parameters_request, identity):
+    return ((VIEW_RESOURCE,), view_name, parameters_key(parameters_request), identity)
+
+
+class QueryResultCache:
+    # Caches DQL and view responses keyed on (resources read, normalized statement, caller identity,
+    # biscuit scope). Entries expire after ttl seconds and the least recently used are evicted
+    # once the cached responses take more than max_bytes.
+    def __init__(self, ttl=DEFAULT_RESULT_TTL, max_bytes=DEFAULT_RESULT_MAX_BYTES):
+        self.entries = TTLCache(max_bytes, ttl, getsizeof=lambda response: len(response.encode("utf-8")))
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Invalidation counters per resource, and of clear(). A result fetched while one of its
+        # resources was invalidated may predate the write and is not cached.
+        self.generations = {}
+        self.cleared = 0
+
+    def dql_key(self, resource_id, sql_text, identity, biscuit, row_count=0):
+        return dql_key(resource_id, sql_text, identity, biscuit, row_count)
+
+    def view_key(self, view_name, parameters_request, identity):
+        return view_key(view_name, parameters_request, identity)
+
+    def get(self, key):
+        response = self.entries.get(key)
+        with self.lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    # Invalidation generation of a key, taken before fetching the result to cache.
+    def generation(self, key):
+        with self.lock:
+            return self.current_generation(key)
+
+    # Called with the lock held.
+    def current_generation(self, key):
+        return self.cleared, tuple(self.generations.get(resource, 0) for resource in key[0])
+
+    # Caches a response, unless `generation` is given and the key was invalidated since it was taken.
+    def set(self, key, response, ttl=None, generation=None):
+        with self.lock:
+            if generation is not None and generation != self.current_generation(key):
+                return
+            self.entries.set(key, response, ttl)
+
+    # Drops the cached results reading a resource, and every view result since views may read it.
+    def invalidate_resource(self, resource_id):
+        resource_id = resource_id.upper()
+        with self.lock:
+            for resource in (resource_id, VIEW_RESOURCE):
+                self.generations[resource] = self.generations.get(resource, 0) + 1
+        return self.entries.discard(lambda key: resource_id in key[0] or VIEW_RESOURCE in key[0])
+
+    def clear(self):
+        with self.lock:
+            self.cleared += 1
+        self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.entries.currsize,
+            "max_bytes": self.entries.maxsize
+        }
@@ -0,0 +1,325 @@
+# Runs SQL scripts against the gateway, executing independent statements concurrently.
+#
+#   python script_runner.py migrations/ --workers 16 --checkpoint migrations.checkpoint.json
+#   python script_runner.py nightly_load.sql --dry-run
+#
+# A directory runs its *.sql files in name order as one script. Each statement is classified
+# locally (see sql_router.classify) and ordered after the earlier statements touching the same
+# table or schema: a statement changing a table waits for everything before it on that table, a
+# statement only reading it waits for the last change, table statements wait for the creation of
+# their schema and tables wait for the tables their foreign keys reference. Everything else runs
+# at once on `workers` threads. With a checkpoint file the statements that succeeded are
+# recorded as they complete, and running the script again skips them, so a failed run resumes
+# where it stopped.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from result_cache import normalize_sql
+from sql_router import classify, strip_literals, CREATE_SCHEMA, DROP_SCHEMA, DQL
+
+DEFAULT_SCRIPT_WORKERS = 8
+SCRIPT_SUFFIX = ".sql"
+
+_leading_comments = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+
+
+class ScriptError(Exception):
+    pass
+
+
+class ScriptStatement:
+    def __init__(self, index, source, line, sql_text):
+        self.index = index
+        self.source = source
+        self.line = line
+        self.sql_text = sql_text
+        try:
+            self.statement = classify(sql_text)
+        except ValueError as error:
+            raise ScriptError(f"{self.location}: {error}") from None
+        self.key = None
+
+    @property
+    def location(self):
+        return f"{self.source}:{self.line}"
+
+    # Resources the statement changes and the ones it only reads. Schemas count as resources
+    # of their own, created and dropped by CREATE and DROP SCHEMA and read by every statement on
+    # one of their tables. Tables referenced by foreign keys are read, so they are created first.
+    def accesses(self):
+        if self.statement.statement_type in (CREATE_SCHEMA, DROP_SCHEMA):
+            return self.statement.resources, ()
+        tables = self.statement.resources
+        reads = tables + tuple(table for table in self.statement.foreign_key_tables if table not in tables)
+        schemas = tuple(dict.fromkeys(table.split(".")[0] for table in reads))
+        if self.statement.statement_type == DQL:
+            return (), reads + schemas
+        return tables[:1], reads[1:] + schemas
+
+    def summary(self):
+        return summarize(self.sql_text)
+
+
+def summarize(sql_text, width=60):
+    text = " ".join(sql_text.split())
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+# Splits SQL text on the semicolons outside string literals, quoted identifiers and comments.
+# Yields (line number, statement) for every statement that is not empty or only comments.
+def split_statements(sql_text):
+    start = 0
+    index = 0
+    quote = None
+    length = len(sql_text)
+    while index < length:
+        character = sql_text[index]
+        if quote is not None:
+            if not sql_text.startswith(quote, index):
+                index += 1
+            elif quote in ("'", '"') and sql_text.startswith(quote, index + 1):
+                # A doubled quote is an escaped one.
+                index += 2
+            else:
+                index += len(quote)
+                quote = None
+            continue
+        if character in "'\"":
+            quote = character
+        elif sql_text.startswith("--", index):
+            quote = "\n"
+        elif sql_text.startswith("/*", index):
+            quote = "*/"
+            index += 2
+            continue
+        elif character == ";":
+            yield from statement_at(sql_text, start, index)
+            start = index + 1
+        index += 1
+    yield from statement_at(sql_text, start, length)
+
+
+# The statement between start and end, without the comments before it.
+def statement_at(sql_text, start, end):
+    start = _leading_comments.match(sql_text, start, end).end()
+    statement = sql_text[start:end].strip()
+    if strip_literals(statement).strip():
+        yield sql_text.count("\n", 0, start) + 1, statement
+
+
+# Reads a script file, or every *.sql file of a directory in name order, into ScriptStatements.
+def load_script(path):
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(SCRIPT_SUFFIX))
+    else:
+        files = [path]
+
+    statements = []
+    occurrences = {}
+    for file_path in files:
+        with open(file_path) as file:
+            sql_text = file.read()
+        for line, statement_text in split_statements(sql_text):
+            statement = ScriptStatement(len(statements), os.path.basename(file_path), line, statement_text)
+            # Checkpoints identify statements by their normalized text, so reformatting or inserting
+            # statements does not invalidate them. Repeated statements are told apart by occurrence.
+            normalized = normalize_sql(statement_text)
+            occurrence = occurrences[normalized] = occurrences.get(normalized, 0) + 1
+            statement.key = hashlib.sha256(f"{occurrence}\0{normalized}".encode()).hexdigest()
+            statements.append(statement)
+    return statements
+
+
+# Dependency graph of the statements, an edge meaning the first must complete before the second starts.
+def build_graph(statements):
+    import networkx as nx
+
+    graph = nx.DiGraph()
+    last_writer = {}
+    readers = {}
+    for statement in statements:
+        graph.add_node(statement.index)
+        writes, reads = statement.accesses()
+        for resource in reads:
+            if resource in last_writer:
+                graph.add_edge(last_writer[resource], statement.index)
+            readers.setdefault(resource, []).append(statement.index)
+        for resource in writes:
+            for reader in readers.pop(resource, []):
+                if reader != statement.index:
+                    graph.add_edge(reader, statement.index)
+            if resource in last_writer:
+                graph.add_edge(last_writer[resource], statement.index)
+            last_writer[resource] = statement.index
+    return graph
+
+
+def read_checkpoint(path):
+    if path is None or not os.path.exists(path):
+        return set()
+    with open(path) as file:
+        return set(json.load(file).get("completed", []))
+
+
+def write_checkpoint(path, completed):
+    # Written to a temporary file first and renamed, so an interrupted run never leaves a broken checkpoint.
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump({"completed": sorted(completed)}, file)
+    os.replace(temporary_path, path)
+
+
+class ScriptRunner:
+    # Executes the statements of a script through sdk.execute(), at most `workers` at a time and
+    # each only once the statements it depends on have succeeded. A failed statement stops the run
+    # after the statements already running finish; with continue_on_error only the statements
+    # depending on it are skipped. `progress` is called with each result as it completes.
+    def __init__(self, sdk, statements, workers=DEFAULT_SCRIPT_WORKERS, checkpoint=None, continue_on_error=False,
+                 biscuit=None, access_type="permissioned", progress=None):
+        self.sdk = sdk
+        self.statements = statements
+        self.graph = build_graph(statements)
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.continue_on_error = continue_on_error
+        self.biscuit = biscuit
+        self.access_type = access_type
+        self.progress = progress
+        self.completed = read_checkpoint(checkpoint)
+
+    # Groups of statements that can run together, each group depending only on earlier ones.
+    def stages(self):
+        import networkx as nx
+
+        return [[self.statements[index] for index in sorted(stage)] for stage in nx.topological_generations(self.graph)]
+
+    def execute(self, statement):
+        started = time.perf_counter()
+        try:
+            statement_data = self.sdk.execute(statement.sql_text, self.biscuit, self.access_type)
+        except Exception as error:
+            statement_data = {"response" : None, "error" : str(error)}
+        return self.result(statement, "failed" if statement_data["error"] else "done", statement_data["error"],
+                           time.perf_counter() - started)
+
+    def result(self, statement, status, error=None, seconds=0.0):
+        return {
+            "statement": statement.index,
+            "location": statement.location,
+            "sql_text": statement.sql_text,
+            "status": status,
+            "error": error,
+            "seconds": seconds
+        }
+
+    def report(self, result, results):
+        results[result["statement"]] = result
+        if self.progress is not None:
+            self.progress(result, len(results), len(self.statements))
+
+    # Runs the script and returns one result per statement, in script order. Statements skipped
+    # because a statement they depend on failed, or because the run stopped, have status "skipped";
+    # statements found in the checkpoint have status "resumed".
+    def run(self):
+        graph = self.graph
+        waiting_on = {index: graph.in_degree(index) for index in graph}
+        ready = deque(index for index, count in waiting_on.items() if count == 0)
+        pending = {}
+        results = {}
+        stopped = False
+
+        def release(index):
+            for successor in graph.successors(index):
+                waiting_on[successor] -= 1
+                if waiting_on[successor] == 0:
+                    ready.append(successor)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while ready or pending:
+                while ready and not stopped and len(pending) < self.workers:
+                    statement = self.statements[ready.popleft()]
+                    if statement.key in self.completed:
+                        self.report(self.result(statement, "resumed"), results)
+                        release(statement.index)
+                        continue
+                    pending[executor.submit(self.execute, statement)] = statement
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    statement = pending.pop(future)
+                    result = future.result()
+                    self.report(result, results)
+                    if result["error"]:
+                        stopped = stopped or not self.continue_on_error
+                        continue
+                    if self.checkpoint is not None:
+                        self.completed.add(statement.key)
+                        write_checkpoint(self.checkpoint, self.completed)
+                    release(statement.index)
+
+        for statement in self.statements:
+            if statement.index not in results:
+                self.report(self.result(statement, "skipped"), results)
+        return [results[statement.index] for statement in self.statements]
+
+
+def print_progress(result, done, total):
+    line = f"[{done}/{total}] {result['status']:<8} {result['seconds']:>7.2f}s  {result['location']}  {summarize(result['sql_text'])}"
+    if result["error"]:
+        line += f"\n    {result['error']}"
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a SQL script, executing independent statements concurrently.")
+    parser.add_argument("path", help="SQL script, or a directory whose *.sql files run in name order")
+    parser.add_argument("--workers", type=int, default=DEFAULT_SCRIPT_WORKERS, help="statements running at once")
+    parser.add_argument("--checkpoint", help="JSON file recording completed statements, a rerun skips them")
+    parser.add_argument("--continue-on-error", action="store_true", help="only skip the statements depending on a failed one")
+    parser.add_argument("--biscuit", help="biscuit sent with every statement, minted per statement by default")
+    parser.add_argument("--access-type", default="permissioned", help="access type of created tables")
+    parser.add_argument("--dry-run", action="store_true", help="print the execution stages without running anything")
+    args = parser.parse_args()
+
+    try:
+        statements = load_script(args.path)
+    except (OSError, ScriptError) as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    if args.dry_run:
+        runner = ScriptRunner(None, statements, args.workers, args.checkpoint)
+        for number, stage in enumerate(runner.stages(), 1):
+            print(f"stage {number}: {len(stage)} statements")
+            for statement in stage:
+                resumed = "  (completed)" if statement.key in runner.completed else ""
+                print(f"    {statement.location}  {statement.summary()}{resumed}")
+        return 0
+
+    from spaceandtimesdk import SpaceAndTimeSDK
+
+    with SpaceAndTimeSDK(pool_size=args.workers) as sdk:
+        runner = ScriptRunner(sdk, statements, args.workers, args.checkpoint, args.continue_on_error,
+                              args.biscuit, args.access_type, print_progress)
+        started = time.perf_counter()
+        results = runner.run()
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print(", ".join(f"{count} {status}" for status, count in counts.items()) + f" in {time.perf_counter() - started:.1f}s")
+    return 1 if counts.get("failed") or counts.get("skipped") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flow_control import FlowControl
+from spaceandtimesdk import SpaceAndTimeSDK
+
+DEFAULT_SHARDS = 64
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+
+# Pooled sessions share the gateway with many others, so each keeps a small connection pool.
+DEFAULT_SESSION_POOL_SIZE = 2
+
+
+class Identity:
+    # Credentials one pooled session authenticates with.
+    def __init__(self, user_id, private_key, public_key, join_code=None, scheme="ed25519", prefix=""):
+        self.user_id = user_id
+        self.private_key = private_key
+        self.public_key = public_key
+        self.join_code = join_code
+        self.scheme = scheme
+        self.prefix = prefix
+
+    def options(self):
+        return {
+            "user_id": self.user_id,
+            "private_key": self.private_key,
+            "public_key": self.public_key,
+            "join_code": self.join_code,
+            "scheme": self.scheme,
+            "prefix": self.prefix
+        }
+
+
+class Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.identities = {}
+        # user ID -> [sdk, last used (monotonic seconds)], least recently used first.
+        self.sessions = OrderedDict()
+        self.last_sweep = time.monotonic()
+
+
+class SessionPool:
+    # One SpaceAndTimeSDK per registered identity, each with its own keys, tokens and connection
+    # pool, so a single process can act as many users. Sessions are created on first use and
+    # authenticate lazily on their first gateway call; afterwards their tokens are reused until
+    # they need renewing. Identities are spread over `shards`, each with its own lock, so callers
+    # acting as different users do not contend. Sessions unused for `idle_timeout` seconds are
+    # closed, and past `max_sessions` the least recently used are closed first. Closed sessions
+    # are recreated on demand, reusing their tokens when `session_dir` is set.
+    def __init__(self, shards=DEFAULT_SHARDS, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_sessions=None,
+                 session_dir=None, pool_size=DEFAULT_SESSION_POOL_SIZE, background_refresh=False, **sdk_options):
+        self.shards = [Shard() for _ in range(shards)]
+        self.idle_timeout = idle_timeout
+        self.max_sessions_per_shard = -(-max_sessions // shards) if max_sessions else None
+        self.session_dir = session_dir
+        self.sdk_options = dict(sdk_options, pool_size=pool_size, background_refresh=background_refresh, use_env=False)
+        # Every session talks to the same gateway, so they share its concurrency limits and circuit breakers.
+        if self.sdk_options.get("flow_control", True) is True:
+            self.sdk_options["flow_control"] = FlowControl()
+        self.closed = False
+
+    def shard(self, user_id):
+        return self.shards[hash(user_id) % len(self.shards)]
+
+    def session_file(self, user_id):
+        if self.session_dir is None:
+            return None
+        return os.path.join(self.session_dir, f"session-{hashlib.sha256(user_id.encode()).hexdigest()[:32]}.txt")
+
+    # Adds (or replaces) the credentials of a user. A session holding older credentials is closed.
+    def register(self, user_id, private_key, public_key, join_code=None, scheme="ed25519", prefix=""):
+        shard = self.shard(user_id)
+        with shard.lock:
+            shard.identities[user_id] = Identity(user_id, private_key, public_key, join_code, scheme, prefix)
+            entry = shard.sessions.pop(user_id, None)
+        if entry is not None:
+            entry[0].close()
+
+    # Forgets a user and closes their session.
+    def unregister(self, user_id):
+        shard = self.shard(user_id)
+        with shard.lock:
+            shard.identities.pop(user_id, None)
+            entry = shard.sessions.pop(user_id, None)
+        if entry is not None:
+            entry[0].close()
+
+    # Returns the SDK acting as user_id, creating it the first time.
+    def session(self, user_id):
+        if self.closed:
+            raise RuntimeError("Session pool is closed")
+        shard = self.shard(user_id)
+        now = time.monotonic()
+        evicted = []
+        with shard.lock:
+            entry = shard.sessions.get(user_id)
+            if entry is not None:
+                entry[1] = now
+                shard.sessions.move_to_end(user_id)
+            else:
+                identity = shard.identities.get(user_id)
+                if identity is None:
+                    raise KeyError(f"Unknown user {user_id}, register it first")
+                sdk = SpaceAndTimeSDK(session_file=self.session_file(user_id), **identity.options(), **self.sdk_options)
+                entry = shard.sessions[user_id] = [sdk, now]
+            evicted = self.take_evicted(shard, now)
+
+        for sdk in evicted:
+            sdk.close()
+        return entry[0]
+
+    __getitem__ = session
+
+    # Removes the idle sessions of a shard (swept at most every idle_timeout / 2 seconds) and
+    # the least recently used ones over its share of max_sessions. Called with the shard lock held.
+    def take_evicted(self, shard, now):
+        evicted = []
+        if self.idle_timeout is not None and now - shard.last_sweep >= self.idle_timeout / 2:
+            shard.last_sweep = now
+            for user_id, (sdk, last_used) in list(shard.sessions.items()):
+                if now - last_used < self.idle_timeout:
+                    break
+                evicted.append(shard.sessions.pop(user_id)[0])
+        if self.max_sessions_per_shard is not None:
+            while len(shard.sessions) > self.max_sessions_per_shard:
+                evicted.append(shard.sessions.popitem(last=False)[1][0])
+        return evicted
+
+    # Closes every session idle for longer than idle_timeout, returns how many were closed.
+    def evict_idle(self):
+        now = time.monotonic()
+        count = 0
+        for shard in self.shards:
+            with shard.lock:
+                shard.last_sweep = float("-inf")
+                evicted = self.take_evicted(shard, now)
+            for sdk in evicted:
+                sdk.close()
+            count += len(evicted)
+        return count
+
+    def close(self):
+        self.closed = True
+        for shard in self.shards:
+            with shard.lock:
+                sessions = [sdk for sdk, _ in shard.sessions.values()]
+                shard.sessions.clear()
+            for sdk in sessions:
+                sdk.close()
+
+    def __len__(self):
+        return sum(len(shard.sessions) for shard in self.shards)
+
+    def __contains__(self, user_id):
+        return user_id in self.shard(user_id).identities
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
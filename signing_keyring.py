@@ -0,0 +1,55 @@
+import base64
+import threading
+
+
+class SigningKeyring:
+    # Parses each Base64 private key once and caches its SigningKey / VerifyKey pair,
+    # so repeated authentications with the same key only pay for the signature itself.
+    def __init__(self):
+        self.keys = {}
+        self.lock = threading.Lock()
+
+    # Returns the cached (SigningKey, VerifyKey) pair for a Base64 encoded private key.
+    def get(self, b64_private_key):
+        key_pair = self.keys.get(b64_private_key)
+        if key_pair is None:
+            # nacl is only imported when the first key is parsed.
+            from nacl.signing import SigningKey
+
+            signing_key = SigningKey(base64.b64decode(b64_private_key))
+            key_pair = (signing_key, signing_key.verify_key)
+            with self.lock:
+                key_pair = self.keys.setdefault(b64_private_key, key_pair)
+        return key_pair
+
+    def signing_key(self, b64_private_key):
+        return self.get(b64_private_key)[0]
+
+    def verify_key(self, b64_private_key):
+        return self.get(b64_private_key)[1]
+
+    # Signs an auth code and returns the hex encoded 64 byte signature.
+    def sign(self, auth_code, b64_private_key):
+        return self.signing_key(b64_private_key).sign(bytes(auth_code, 'utf-8')).signature.hex()
+
+    # Signs many (auth_code, b64_private_key) pairs in one call, returning the signatures in order.
+    def sign_many(self, auth_codes_and_keys):
+        signatures = []
+        for auth_code, b64_private_key in auth_codes_and_keys:
+            signatures.append(self.sign(auth_code, b64_private_key))
+        return signatures
+
+    def forget(self, b64_private_key):
+        with self.lock:
+            self.keys.pop(b64_private_key, None)
+
+    def clear(self):
+        with self.lock:
+            self.keys.clear()
+
+    def __len__(self):
+        return len(self.keys)
+
+
+# Keyring shared by every SDK instance in the process.
+default_keyring = SigningKeyring()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Coalesces concurrent calls with the same key: the first caller runs the function while
+    # later callers wait for it and receive the same result, or the same exception.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, function):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.leaders, "coalesced": self.followers, "in_flight": len(self.calls)}
+
+
+class AsyncSingleFlight:
+    # asyncio counterpart of SingleFlight, for coroutines running on one event loop.
+    def __init__(self):
+        self.calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, function):
+        future = self.calls.get(key)
+        if future is not None:
+            self.followers += 1
+            # Shielded so that a cancelled follower does not cancel the shared call.
+            return await asyncio.shield(future)
+
+        self.leaders += 1
+        future = self.calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await function()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Marks the exception as retrieved when no caller was waiting for it.
+            future.exception()
+            raise
+        finally:
+            del self.calls[key]
+
+    def stats(self):
+        return {"requests": self.leaders, "coalesced": self.followers, "in_flight": len(self.calls)}
@@ -1,28 +1,118 @@
 import requests
-import ed25519
-import base64
-import binascii
-import json
-from datetime import datetime
 import os
-from nacl.signing import SigningKey, VerifyKey
-from nacl.exceptions import BadSignatureError
 from dotenv import load_dotenv, set_key, get_key
 
-from keygen import exported_keys
+import keygen
+from biscuits import default_minter, statement_capability
+from bulk_insert import BulkStatementBuilder, normalize_rows, run_batches, DEFAULT_MAX_PAYLOAD_BYTES
+from columnar import build_columns, column_types_from_metadata, to_dataframe
+from flow_control import FlowControl, DEFAULT_INITIAL_LIMIT
+from metadata_cache import prefetch_namespace, DEFAULT_PREFETCH_WORKERS
+from partitioned_query import partitioned_rows, PartitionQueryError, DEFAULT_WORKERS, DEFAULT_PAGE_SIZE
+from result_cache import dql_key, view_key
+from script_runner import load_script, ScriptRunner, ScriptError, DEFAULT_SCRIPT_WORKERS
+from signing_keyring import default_keyring
+from singleflight import SingleFlight
+from sql_router import classify, CREATE_SCHEMA, DROP_SCHEMA, CREATE_TABLE, DQL
+from streaming import iter_response_rows, RowStream
+from token_manager import TokenManager, MINIMUM_TOKEN_SECONDS
+from token_store import SESSION_FILE, FileTokenStore, MemoryTokenStore, read_session_file, write_session_file
+from transport import Transport, DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_ACCEPT_ENCODING
+from validation import try_parse_identifier, validate_string, validate_number
+from view_batch import unique_parameter_sets, iter_view_results, tagged_rows, failure_summary, DEFAULT_VIEW_WORKERS, DEFAULT_TAG_COLUMN
+
+# DQL and view result formats: the raw response text, a generator of rows parsed while the body
+# downloads, a {column: ndarray} dict or a pandas DataFrame built straight from the streamed rows.
+RESULT_FORMATS = ("text", "stream", "columns", "dataframe")
 
 class SpaceAndTimeSDK:
-    def __init__(self):
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, keep_alive=True,
+                 refresh_margin=MINIMUM_TOKEN_SECONDS, background_refresh=True, metadata_cache=None,
+                 result_cache=None, hooks=None, user_id=None, join_code=None, scheme=None, private_key=None,
+                 public_key=None, prefix="", session_file=SESSION_FILE, use_env=True, token_store=None,
+                 write_env=True, coalesce=True, codec=None, compress_min_bytes=None,
+                 accept_encoding=DEFAULT_ACCEPT_ENCODING, flow_control=True):
         self.base_url = os.getenv('BASEURL')
 
+        # Identity this SDK acts as. Values that are not given are read from the USERID, JOINCODE,
+        # SCHEME, PRIVATEKEY and PUBLICKEY env variables unless use_env is False, in which case
+        # the keys are never written back to .env either. write_env=False only stops the writes.
+        self.credentials = {"USERID": user_id, "JOINCODE": join_code, "SCHEME": scheme, "PRIVATEKEY": private_key, "PUBLICKEY": public_key}
+        self.prefix = prefix
+        self.session_file = session_file
+        self.use_env = use_env
+        self.write_env = write_env
+
+        # Where tokens are persisted, see token_store: session_file by default, memory only when it is None,
+        # or a SharedTokenStore to share one token set between the worker processes of a host.
+        if token_store is None:
+            token_store = FileTokenStore(session_file) if session_file else MemoryTokenStore()
+        self.token_store = token_store
+
+        # Every gateway call goes through this pooled transport. `hooks` are called with an
+        # instrumentation.RequestEvent for each call, see add_hook(). Request and response JSON is
+        # encoded and decoded with `codec`: "json" by default, or "orjson", "ujson" and "auto" for the
+        # fastest installed, which do not keep integers wider than 64 bits exact. Request bodies of
+        # compress_min_bytes or more are sent gzip compressed.
+        # flow_control adapts the number of concurrent calls per endpoint class to what the gateway
+        # sustains and retries throttled calls, see flow_control.FlowControl. Pass False to turn it off
+        # or a FlowControl to share one between SDK instances.
+        if flow_control is True:
+            flow_control = FlowControl(initial_limit=max(pool_size, DEFAULT_INITIAL_LIMIT))
+        self.flow_control = flow_control or None
+        self.transport = Transport(self.base_url, pool_size=pool_size, connect_timeout=connect_timeout,
+                                   read_timeout=read_timeout, max_retries=max_retries, keep_alive=keep_alive,
+                                   hooks=hooks, codec=codec, compress_min_bytes=compress_min_bytes,
+                                   accept_encoding=accept_encoding, flow_control=self.flow_control)
+        self.instrumentation = self.transport.instrumentation
+        self.codec = self.transport.codec
+
+        # Parsed signing keys are shared by every SDK instance in the process.
+        self.keyring = default_keyring
+
+        # Biscuits minted from capability facts are shared by every SDK instance in the process.
+        self.biscuit_minter = default_minter
+
+        # Tokens are kept in memory and renewed ahead of expiry, the session file is only read once.
+        self.token_manager = TokenManager(self, refresh_margin=refresh_margin, background=background_refresh,
+                                          store=token_store)
+
+        # Optional metadata_cache.MetadataCache serving repeated discovery calls without a gateway round trip.
+        self.metadata_cache = metadata_cache
+
+        # Optional result_cache.QueryResultCache for repeated DQL and view reads, see result_cache_stats().
+        self.result_cache = result_cache
+
+        # Concurrent identical text DQL and view reads share one gateway request unless coalesce is False.
+        self.single_flight = SingleFlight() if coalesce else None
+
+    # Releases the pooled gateway connections and stops the background token refresh.
+    def close(self):
+        self.token_manager.stop()
+        self.transport.close()
+
+    # Registers a request hook, e.g. instrumentation.PrometheusExporter().
+    def add_hook(self, hook):
+        return self.instrumentation.add(hook)
+
+    def remove_hook(self, hook):
+        self.instrumentation.remove(hook)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     """ Authentication APIs """
     # Check if a User is using the ID
     def check_user_identifier(self, user_id):
         try:
 
-            api_endpoint = f"{self.base_url}/auth/idexists/{user_id}"
+            api_endpoint = f"/auth/idexists/{user_id}"
             headers = {"accept": "application/json"}
-            response = requests.get(api_endpoint,headers=headers)
+            response = self.transport.get(api_endpoint,headers=headers)
             response.raise_for_status()
             return {"response" : response.text, "error" : None}
 
@@ -33,7 +123,7 @@ class SpaceAndTimeSDK:
     def generate_auth_code(self, user_id, prefix, join_code):
         try:
             
-            api_endpoint = f"{self.base_url}/auth/code"
+            api_endpoint = "/auth/code"
             payload = {
                 'userId': user_id,
                 'prefix': prefix,
@@ -45,7 +135,7 @@ class SpaceAndTimeSDK:
                 "content-type": "application/json"
             }     
 
-            response = requests.post(api_endpoint, json=payload, headers=headers)
+            response = self.transport.post(api_endpoint, json=payload, headers=headers)
             response.raise_for_status()
             return {"response" : response.text, "error" : None}
     
@@ -56,12 +146,8 @@ class SpaceAndTimeSDK:
     def signature_generation(self, auth_code, priv_key_arg, public_key_arg):
         
         
-        message = bytes(auth_code, 'utf-8')
-        private_key = self.signing_keys_convert(priv_key_arg)
-
-        signature = private_key.sign(message)
-
-        hex_signature = binascii.hexlify(signature).decode()[:128]
+        # The parsed signing key is cached in the keyring, only the signature is computed per call.
+        hex_signature = self.keyring.sign(auth_code, priv_key_arg)
         keys_content_object = {
             'b64_private_key':priv_key_arg,
             'b64_public_key':public_key_arg,
@@ -75,7 +161,7 @@ class SpaceAndTimeSDK:
 
         try:
 
-            api_endpoint = f"{self.base_url}/auth/token"
+            api_endpoint = "/auth/token"
             signature_contents = self.signature_generation(auth_code, private_key, public_key)
             b64_private_key, b64_public_key, hex_signature = signature_contents.values()
 
@@ -92,60 +178,65 @@ class SpaceAndTimeSDK:
                     "content-type": "application/json"
             }     
 
-            response = requests.post(api_endpoint, json=payload, headers=headers)
+            response = self.transport.post(api_endpoint, json=payload, headers=headers)
             response.raise_for_status()
             return {"response" : response.text, "error" : None}
         
         except requests.exceptions.RequestException as error:
             return {"response" : None, "error" : str(error)}
 
+    # Returns the cached Signing Key for a Base64 private key.
     def signing_keys_convert(self, private_key_arg):
+        return self.keyring.signing_key(private_key_arg)
 
-        # Decoding the Base64 Key.
-        decoded_private_key = base64.b64decode(private_key_arg)
-
-        # Converting the decoded Base64 Key to a Signing Key.
-        private_signing_key = SigningKey(decoded_private_key)
-
-        return private_signing_key
+    # Value of an identity setting: the one given to the constructor, else the env variable.
+    def setting(self, name):
+        value = self.credentials.get(name)
+        if value or not self.use_env:
+            return value
+        return os.getenv(name)
 
     def read_file_contents(self):
-        with open("session.txt") as file:
-            access_token = file.readline().strip()
-            refresh_token = file.readline().strip()
-            access_token_expires = file.readline().strip()
-            refresh_token_expires = file.readline().strip()
-
-        token_obj = {
-            "accessToken": access_token,
-            "refreshToken": refresh_token,
-            "accessTokenExpires": access_token_expires,
-            "refreshTokenExpires":refresh_token_expires
-        }
-
-        return token_obj
+        if self.session_file is None:
+            raise FileNotFoundError("No session file")
+        return read_session_file(self.session_file)
 
     def write_to_file(self, accessToken, refreshToken, accessTokenExpires, refreshTokenExpires):
-        with open("session.txt", "w") as file:
-            file.write(accessToken + "\n")
-            file.write(refreshToken + "\n")
-            file.write(str(accessTokenExpires) + "\n")
-            file.write(str(refreshTokenExpires) + "\n")
+        if self.session_file is None:
+            return
+        write_session_file(self.session_file, {
+            "accessToken": accessToken,
+            "refreshToken": refreshToken,
+            "accessTokenExpires": accessTokenExpires,
+            "refreshTokenExpires": refreshTokenExpires
+        })
 
     def user_id_exists(self):
-        user_id = os.getenv('USERID')
+        user_id = self.setting('USERID')
         user_id_response = self.check_user_identifier(user_id)["response"]
         
         final_result = True if (user_id_response == 'true') else False
         return final_result
     
-    def authenticate_user(self, private_key_arg="", public_key_arg=""):
+    # Picks the keys to authenticate with: the SDK's own keys (or the PRIVATEKEY / PUBLICKEY env values), then the
+    # given ones, then the generated ones. Keys are only generated (or loaded from the key store) when none are provided.
+    def resolve_keys(self, private_key_arg="", public_key_arg=""):
+
+        pub_key = self.setting('PUBLICKEY') or public_key_arg
+        priv_key = self.setting('PRIVATEKEY') or private_key_arg
 
-        main_public_key = exported_keys["b64_public_key"] if public_key_arg == "" else public_key_arg
-        main_private_key = exported_keys["b64_private_key"] if private_key_arg == "" else private_key_arg
+        if not pub_key or not priv_key:
+            if not self.use_env:
+                raise ValueError(f"No keys configured for user {self.identity()}")
+            exported_keys = keygen.get_exported_keys()
+            pub_key = pub_key or exported_keys["b64_public_key"]
+            priv_key = priv_key or exported_keys["b64_private_key"]
+
+        return priv_key, pub_key
+
+    def authenticate_user(self, private_key_arg="", public_key_arg=""):
 
-        pub_key = main_public_key if os.getenv('PUBLICKEY') is None else os.getenv('PUBLICKEY')
-        priv_key = main_private_key if os.getenv('PRIVATEKEY') is None else os.getenv('PRIVATEKEY')
+        priv_key, pub_key = self.resolve_keys(private_key_arg, public_key_arg)
 
         if not self.user_id_exists():
             print('Lets create your user ID!')
@@ -157,17 +248,19 @@ class SpaceAndTimeSDK:
 
 
     #Creates Access and Refresh Tokens for Users
-    def authenticate(self, priv_key, pub_key, prefix=""):
+    def authenticate(self, priv_key="", pub_key="", prefix=""):
 
-        user_id = os.getenv('USERID')
-        join_code = os.getenv('JOINCODE')
-        scheme = os.getenv('SCHEME')
+        priv_key, pub_key = self.resolve_keys(priv_key, pub_key)
 
-        auth_code_data = self.generate_auth_code(user_id, prefix, join_code)
+        user_id = self.setting('USERID')
+        join_code = self.setting('JOINCODE')
+        scheme = self.setting('SCHEME') or "ed25519"
+
+        auth_code_data = self.generate_auth_code(user_id, prefix or self.prefix, join_code)
         auth_code_response, auth_code_error = auth_code_data["response"], auth_code_data["error"]
         if auth_code_error: raise Exception(auth_code_error)
 
-        auth_code = json.loads(auth_code_response)["authCode"]
+        auth_code = self.codec.loads(auth_code_response)["authCode"]
 
         required_private_key = priv_key 
         required_public_key = pub_key 
@@ -176,56 +269,35 @@ class SpaceAndTimeSDK:
         tokens_response, tokens_error = tokens_data["response"], tokens_data["error"]
         if tokens_error: raise Exception(tokens_error)
 
-        jsonResponse = json.loads(tokens_response)
+        jsonResponse = self.codec.loads(tokens_response)
 
-        # Writing Token response to file
-        self.write_to_file(jsonResponse["accessToken"], jsonResponse["refreshToken"], jsonResponse["accessTokenExpires"], jsonResponse["refreshTokenExpires"])
+        # Keeping the tokens in memory and writing them to file
+        self.token_manager.update(jsonResponse)
         
         # Writing key values to ENV
-        
-        set_key(".env", "PUBLICKEY", required_public_key)
-        set_key(".env", "PRIVATEKEY", required_private_key)
+        if self.use_env and self.write_env:
+            set_key(".env", "PUBLICKEY", required_public_key)
+            set_key(".env", "PRIVATEKEY", required_private_key)
 
         return {"response" : jsonResponse, "error" : tokens_error}
 
     # Allows the user to generate new tokens if time left is less than or equal to 2 minutes OR gives them back their unexpired tokens.
+    # The refresh token is used while it is valid, otherwise the user is authenticated again.
     def rotate_tokens(self):
-        MINIMUM_TOKEN_SECONDS = 120
-
-        tokens = self.read_file_contents()
-        access_token, refresh_token = tokens['accessToken'], tokens['refreshToken']
-        access_token_expires, refresh_token_expires = int(tokens['accessTokenExpires']), int(tokens['refreshTokenExpires'])
-
-        authentication_tokens = [access_token, refresh_token]
-
-        current_milliseconds = int(datetime.timestamp(datetime.now()) * 1000)
-
-        access_token_expiry_datetime = datetime.fromtimestamp((current_milliseconds + access_token_expires) / 1000)
-        refresh_token_expiry_datetime = datetime.fromtimestamp((current_milliseconds + refresh_token_expires) / 1000)
-
-        access_token_expiry_duration = round((access_token_expiry_datetime - datetime.now()).total_seconds())
-        refresh_token_expiry_duration = round((refresh_token_expiry_datetime - datetime.now()).total_seconds())
-
-        should_refresh_token = access_token_expiry_duration <= MINIMUM_TOKEN_SECONDS
-        should_authenticate_user = refresh_token_expiry_duration <= MINIMUM_TOKEN_SECONDS
-
-        if should_refresh_token: 
-            if should_authenticate_user:
-                token_response, token_error = self.authenticate()
-                return token_response, token_error
-            
-            refresh_token_response, refresh_token_error = self.refresh_token()
-            return refresh_token_response, refresh_token_error
+        try:
+            self.token_manager.access_token()
+        except Exception as error:
+            return None, str(error)
 
-        return authentication_tokens, None
+        tokens = self.token_manager.tokens
+        return [tokens["accessToken"], tokens["refreshToken"]], None
 
     # Checks if your accessToken value is valid and gives you the UserID on success.
     def validate_token(self):
         try:
-            tokens = self.read_file_contents()
-            access_token = tokens["accessToken"]
+            access_token = self.token_manager.access_token()
 
-            api_endpoint = f"{self.base_url}/auth/validtoken"
+            api_endpoint = "/auth/validtoken"
 
             headers = {
                 "accept": "application/json",
@@ -233,7 +305,7 @@ class SpaceAndTimeSDK:
                 "Authorization" : f'Bearer {access_token}'
             }    
 
-            response = requests.get(api_endpoint, headers=headers)
+            response = self.transport.get(api_endpoint, headers=headers)
             response.raise_for_status()
             return {"response" : response.text, "error" : None}
         
@@ -243,24 +315,456 @@ class SpaceAndTimeSDK:
     #Refresh your Access and Refresh Tokens by providing a valid RefreshToken
     def refresh_token(self):
         try:
-            tokens = self.read_file_contents()
-            refresh_token = tokens["refreshToken"]
+            refresh_token = self.token_manager.refresh_token()
 
-            api_endpoint = f"{self.base_url}/auth/refresh"
+            api_endpoint = "/auth/refresh"
             headers = {
                 "accept": "application/json",
                 "Authorization" : f'Bearer {refresh_token}'
             }    
             
-            response = requests.post(api_endpoint, headers=headers)
+            response = self.transport.post(api_endpoint, headers=headers)
+            response.raise_for_status()
+            jsonResponse = self.codec.loads(response.content)
+
+            # Keeping the tokens in memory and writing them to file
+            self.token_manager.update(jsonResponse)
+            return {"response" : response.text, "error" : None}
+
+        except requests.exceptions.RequestException as error:
+            return {"response" : None, "error" : str(error)}
+
+    # Logout or end an authenticated session by invalidating the RefreshToken
+    def logout(self):
+        try:
+            refresh_token = self.token_manager.refresh_token()
+
+            api_endpoint = "/auth/logout"
+            headers = {
+                "accept": "application/json",
+                "Authorization" : f'Bearer {refresh_token}'
+            }
+
+            response = self.transport.post(api_endpoint, headers=headers)
+            response.raise_for_status()
+            self.token_manager.clear()
+            return {"response" : response.text, "error" : None}
+
+        except requests.exceptions.RequestException as error:
+            return {"response" : None, "error" : str(error)}
+
+    """ Discovery APIs """
+    # Sends an authorized GET request to a discovery endpoint
+    # Successful responses are served from the metadata cache when one is configured.
+    def discovery_request(self, api_endpoint, params=None):
+        if self.metadata_cache is not None:
+            cached_response = self.metadata_cache.get(api_endpoint, params)
+            if cached_response is not None:
+                return {"response" : cached_response, "error" : None}
+
+        try:
+            access_token = self.token_manager.access_token()
+
+            headers = {
+                "accept": "application/json",
+                "Authorization" : f'Bearer {access_token}'
+            }
+
+            response = self.transport.get(api_endpoint, params=params, headers=headers)
             response.raise_for_status()
-            jsonResponse = response.json()
+            if self.metadata_cache is not None:
+                self.metadata_cache.set(api_endpoint, params, response.text)
+            return {"response" : response.text, "error" : None}
+
+        except requests.exceptions.RequestException as error:
+            return {"response" : None, "error" : str(error)}
+
+    # Loads every table of a namespace with its columns, indexes and primary keys into the metadata cache
+    # on `workers` threads. Returns the table names of the namespace.
+    def prefetch_namespace(self, namespace, scope="ALL", workers=DEFAULT_PREFETCH_WORKERS):
+        try:
+            return {"response" : prefetch_namespace(self, namespace, scope, workers), "error" : None}
+        except Exception as error:
+            return {"response" : None, "error" : str(error)}
+
+    # Drops cached metadata for a resource after the SDK changes its schema.
+    def invalidate_metadata(self, resource_id=None, namespace=None):
+        if self.metadata_cache is None:
+            return
+        if resource_id:
+            namespace, table_name = try_parse_identifier(resource_id)
+            self.metadata_cache.invalidate_resource(namespace, table_name)
+        elif namespace:
+            self.metadata_cache.invalidate_resource(namespace)
+        else:
+            self.metadata_cache.clear()
+
+    # Drops cached DQL and view results for a resource after the SDK writes to it.
+    def invalidate_results(self, resource_id):
+        if self.result_cache is not None:
+            schema_name, table_name = try_parse_identifier(resource_id)
+            self.result_cache.invalidate_resource(f"{schema_name}.{table_name}")
+
+    # Hit and miss counters of the result cache.
+    def result_cache_stats(self):
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    # Serves a text read from the result cache, or sends it, sharing the request with identical
+    # reads already in flight. Only the caller that sent the request fills the cache.
+    # A read in flight while a write invalidates its resource may not see that write, so its
+    # result is not cached and reads starting after the write do not share it.
+    def shared_read(self, read_key, send_request):
+        generation = None
+        if self.result_cache is not None:
+            generation = self.result_cache.generation(read_key)
+            cached_response = self.result_cache.get(read_key)
+            if cached_response is not None:
+                return {"response" : cached_response, "error" : None}
+
+        def fetch():
+            read_data = send_request()
+            if self.result_cache is not None and read_data["error"] is None:
+                self.result_cache.set(read_key, read_data["response"], generation=generation)
+            return read_data
+
+        if self.single_flight is None:
+            return fetch()
+        return dict(self.single_flight.do((read_key, generation), fetch))
+
+    # Identity the cached results belong to.
+    def identity(self):
+        return self.setting('USERID')
+
+    # List the namespaces
+    def get_namespaces(self):
+        return self.discovery_request("/discover/namespace")
+
+    # List the tables of a namespace. Scope values - ALL, PUBLIC or PRIVATE
+    def get_tables(self, scope, namespace):
+        validate_string(scope)
+        validate_string(namespace)
+        return self.discovery_request("/discover/table", {"scope": scope.upper(), "namespace": namespace.upper()})
+
+    # List table column metadata
+    def get_table_columns(self, table_name, namespace):
+        validate_string(table_name)
+        validate_string(namespace)
+        return self.discovery_request("/discover/table/column", {"namespace": namespace.upper(), "table": table_name.upper()})
+
+    # List table index metadata
+    def get_table_indexes(self, table_name, namespace):
+        validate_string(table_name)
+        validate_string(namespace)
+        return self.discovery_request("/discover/table/index", {"namespace": namespace.upper(), "table": table_name.upper()})
+
+    # List table primary key metadata
+    def get_table_primary_keys(self, table_name, namespace):
+        validate_string(table_name)
+        validate_string(namespace)
+        return self.discovery_request("/discover/table/primaryKey", {"namespace": namespace.upper(), "table": table_name.upper()})
+
+    # List table relationship metadata for all tables of a namespace
+    def get_table_relationships(self, scope, namespace):
+        validate_string(scope)
+        validate_string(namespace)
+        return self.discovery_request("/discover/table/relations", {"namespace": namespace.upper(), "scope": scope.upper()})
+
+    # List all primary key references by the provided foreign key reference
+    def get_primary_key_references(self, table_name, column, namespace):
+        validate_string(table_name)
+        validate_string(column)
+        validate_string(namespace)
+        return self.discovery_request("/discover/refs/primarykey", {"namespace": namespace.upper(), "table": table_name.upper(), "column": column.upper()})
+
+    # List all foreign key references referencing the provided primary key
+    def get_foreign_key_references(self, table_name, column, namespace):
+        validate_string(table_name)
+        validate_string(column)
+        validate_string(namespace)
+        return self.discovery_request("/discover/refs/foreignkey", {"namespace": namespace.upper(), "table": table_name.upper(), "column": column.upper()})
+
+    """ Core SQL APIs """
+    # Sends an authorized SQL statement to one of the /sql endpoints
+    def sql_request(self, api_endpoint, payload, result_format="text", batch_size=None, column_types=None):
+        try:
+            access_token = self.token_manager.access_token()
+
+            headers = {
+                "accept": "application/json",
+                "content-type": "application/json",
+                "Authorization" : f'Bearer {access_token}'
+            }
+
+            response = self.transport.post(api_endpoint, json=payload, headers=headers, stream=result_format != "text")
+            return self.result_data(response, result_format, batch_size, column_types)
+
+        except requests.exceptions.RequestException as error:
+            return {"response" : None, "error" : str(error)}
 
-            # Writing Token response to file
-            self.write_to_file(jsonResponse["accessToken"], jsonResponse["refreshToken"], jsonResponse["accessTokenExpires"], jsonResponse["refreshTokenExpires"])
+    # Decodes a DQL or view response in the requested result format.
+    # Every format other than "text" reads the body incrementally: "stream" hands back a streaming.RowStream
+    # of rows (or lists of batch_size rows), "columns" and "dataframe" fill typed column buffers as rows arrive.
+    def result_data(self, response, result_format="text", batch_size=None, column_types=None):
+        if result_format == "text":
+            response.raise_for_status()
             return {"response" : response.text, "error" : None}
 
+        if not response.ok:
+            response.close()
+        response.raise_for_status()
+
+        if result_format == "stream":
+            return {"response" : RowStream(response, batch_size), "error" : None}
+
+        columns = build_columns(iter_response_rows(response), column_types, result_format == "dataframe")
+        return {"response" : to_dataframe(columns) if result_format == "dataframe" else columns, "error" : None}
+
+    def validate_result_format(self, result_format):
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unsupported result format {result_format}, expected one of {', '.join(RESULT_FORMATS)}")
+
+    # SQL types of a table's columns, used to pick the dtype of each column in a columnar result.
+    def table_column_types(self, resource_id):
+        schema_name, table_name = try_parse_identifier(resource_id)
+        columns_data = self.get_table_columns(table_name, schema_name)
+        if columns_data["error"]:
+            return None
+        return column_types_from_metadata(self.codec.loads(columns_data["response"]))
+
+    # A biscuit of None is minted for the capability the statement needs, "" sends no biscuit.
+    def sql_payload(self, resource_id, sql_text, biscuit):
+        validate_string(sql_text)
+        schema_name, table_name = try_parse_identifier(resource_id)
+        if biscuit is None:
+            biscuit = self.biscuit_for(resource_id, [statement_capability(sql_text)])
+        return {
+            "resourceId": f"{schema_name}.{table_name}",
+            "sqlText": sql_text,
+            "biscuits": [biscuit] if biscuit else []
+        }
+
+    # Mints (or reuses) a biscuit granting `capabilities` on a resource (or list of resources),
+    # signed with private_key or the user's authentication key.
+    def biscuit_for(self, resource_ids, capabilities, private_key=None):
+        private_key = private_key or self.resolve_keys()[0]
+        return self.biscuit_minter.mint(resource_ids, capabilities, private_key)
+
+    # Mints (or reuses) a biscuit for every capability fact of a datalog file such as authorize.datalog.
+    def biscuit_from_datalog(self, path, private_key=None):
+        private_key = private_key or self.resolve_keys()[0]
+        return self.biscuit_minter.mint_from_file(path, private_key)
+
+    # Runs any supported statement. It is classified locally and routed to CreateSchema,
+    # DDLCreateTable, DDL, DML or DQL against the first table it references, after every
+    # referenced resource ID is validated. A biscuit of None is minted for the statement's
+    # capability on that table and dql_select on the other tables it reads. CREATE TABLE uses access_type and public_key
+    # (the user's public key by default); DQL options are passed on to DQL().
+    def execute(self, sql_text, biscuit=None, access_type="permissioned", public_key=None, **dql_options):
+        validate_string(sql_text)
+        statement = classify(sql_text)
+
+        if statement.statement_type == CREATE_SCHEMA:
+            return self.CreateSchema(sql_text, biscuit or "")
+        if statement.statement_type == DROP_SCHEMA:
+            return self.DropSchema(sql_text, biscuit or "")
+
+        if biscuit is None:
+            biscuit = self.biscuit_minter.mint_grants(statement.grants, self.resolve_keys()[0])
+
+        if statement.statement_type == CREATE_TABLE:
+            if public_key is None:
+                private_key, b64_public_key = self.resolve_keys()
+                public_key = keygen.keys_from_b64(private_key, b64_public_key)["hex_public_key"]
+            return self.DDLCreateTable(statement.resource_id, sql_text, access_type, public_key, biscuit)
+
+        if statement.statement_type == DQL:
+            return self.DQL(statement.resource_id, sql_text, biscuit, **dql_options)
+
+        return getattr(self, statement.statement_type)(statement.resource_id, sql_text, biscuit)
+
+    # Runs a SQL script file, or a directory of *.sql files, executing independent statements
+    # on `workers` threads while statements on the same table or schema keep their script order.
+    # With a checkpoint file completed statements are recorded and skipped when run again. The
+    # response lists each statement's location, status and error, see script_runner.ScriptRunner.
+    def execute_script(self, path, workers=DEFAULT_SCRIPT_WORKERS, checkpoint=None, continue_on_error=False,
+                       biscuit=None, access_type="permissioned", progress=None):
+        try:
+            statements = load_script(path)
+        except (OSError, ScriptError) as error:
+            return {"response" : None, "error" : str(error)}
+
+        results = ScriptRunner(self, statements, workers, checkpoint, continue_on_error, biscuit, access_type, progress).run()
+        failed = [result for result in results if result["status"] == "failed"]
+        error = f"{len(failed)} of {len(results)} statements failed, first at {failed[0]['location']}: {failed[0]['error']}" if failed else None
+        return {"response" : results, "error" : error}
+
+    # Create a schema. Requires the ddl_create permission.
+    def CreateSchema(self, sql_text, biscuit=""):
+        validate_string(sql_text)
+        payload = {
+            "sqlText": sql_text,
+            "biscuits": [biscuit] if biscuit else []
+        }
+        schema_data = self.sql_request("/sql/ddl", payload)
+        if schema_data["error"] is None:
+            schema_name = sql_text.split()[-1].strip(";")
+            self.invalidate_metadata(namespace=schema_name)
+        return schema_data
+
+    # Drop a schema. Requires the ddl_drop permission.
+    def DropSchema(self, sql_text, biscuit=""):
+        validate_string(sql_text)
+        payload = {
+            "sqlText": sql_text,
+            "biscuits": [biscuit] if biscuit else []
+        }
+        schema_data = self.sql_request("/sql/ddl", payload)
+        if schema_data["error"] is None:
+            self.invalidate_metadata(namespace=classify(sql_text).resource_id)
+            # Every cached result of the schema's tables is gone with it.
+            if self.result_cache is not None:
+                self.result_cache.clear()
+        return schema_data
+
+    # Create a table. For ALTER and DROP use DDL()
+    def DDLCreateTable(self, resource_id, sql_text, access_type, public_key, biscuit):
+        validate_string(access_type)
+        validate_string(public_key)
+        create_sql_text = f'{sql_text} WITH "public_key={public_key},access_type={access_type}"'
+        ddl_data = self.sql_request("/sql/ddl", self.sql_payload(resource_id, create_sql_text, biscuit))
+        if ddl_data["error"] is None:
+            self.invalidate_metadata(resource_id)
+            self.invalidate_results(resource_id)
+        return ddl_data
+
+    # Alter or drop a table
+    def DDL(self, resource_id, sql_text, biscuit):
+        ddl_data = self.sql_request("/sql/ddl", self.sql_payload(resource_id, sql_text, biscuit))
+        if ddl_data["error"] is None:
+            self.invalidate_metadata(resource_id)
+            self.invalidate_results(resource_id)
+        return ddl_data
+
+    # Insert, update, merge and delete contents of a table
+    def DML(self, resource_id, sql_text, biscuit):
+        dml_data = self.sql_request("/sql/dml", self.sql_payload(resource_id, sql_text, biscuit))
+        if dml_data["error"] is None:
+            self.invalidate_results(resource_id)
+        return dml_data
+
+    # Loads many rows with multi-row INSERT (or MERGE on key_columns) statements.
+    # rows is an iterable of dicts, of value sequences (with columns) or a pandas DataFrame.
+    # Rows are packed into statements that stay under max_payload_bytes and the batches run on
+    # `workers` threads. Every row is checked and packed before the first batch is sent, so an
+    # invalid or oversized row raises ValueError with nothing written. The response lists each
+    # batch with its first row index, row count and its own response or error; error is set when
+    # any batch failed.
+    def DMLBulkInsert(self, resource_id, rows, biscuit, columns=None, statement="INSERT", key_columns=None,
+                      max_payload_bytes=DEFAULT_MAX_PAYLOAD_BYTES, workers=DEFAULT_WORKERS):
+        columns, value_rows = normalize_rows(rows, columns)
+        if not columns:
+            return {"response" : [], "error" : None}
+
+        builder = BulkStatementBuilder(resource_id, columns, statement, key_columns, max_payload_bytes)
+        batches = list(builder.batches(value_rows))
+        results = run_batches(self, builder.resource_id, biscuit, batches, workers)
+
+        failed = [result for result in results if result["error"]]
+        error = f"{len(failed)} of {len(results)} batches failed" if failed else None
+        return {"response" : results, "error" : error}
+
+    # Select query, selects all rows if row_count = 0
+    # result_format="stream" returns an iterator yielding rows as they are downloaded,
+    # or lists of batch_size rows when batch_size is set. Its connection is released once it is
+    # exhausted, closed or discarded.
+    # result_format="columns" or "dataframe" returns typed NumPy columns or a pandas DataFrame.
+    # Column dtypes come from column_types ({column: SQL type}) or the resource's column metadata.
+    # Text results are served from the result cache when one is configured, and identical concurrent
+    # text reads share one request.
+    def DQL(self, resource_id, sql_text, biscuit, row_count=0, result_format="text", batch_size=None, column_types=None):
+        validate_number(row_count)
+        self.validate_result_format(result_format)
+        payload = self.sql_payload(resource_id, sql_text, biscuit)
+        if row_count > 0:
+            payload["rowCount"] = row_count
+
+        if result_format == "text" and (self.result_cache is not None or self.single_flight is not None):
+            read_key = dql_key(payload["resourceId"], sql_text, self.identity(), biscuit, row_count)
+            return self.shared_read(read_key, lambda: self.sql_request("/sql/dql", payload))
+
+        if result_format in ("columns", "dataframe") and column_types is None:
+            column_types = self.table_column_types(resource_id)
+        return self.sql_request("/sql/dql", payload, result_format, batch_size, column_types)
+
+    # Splits a large select into partitions that run concurrently and returns a generator of rows.
+    # mode="range" splits the integer key range (the table's first primary key unless key_column is given)
+    # into `partitions` ranges run on `workers` threads, yielded in key order or, with ordered=False, as they complete.
+    # mode="keyset" pages through any orderable key page_size rows at a time, one page after another.
+    # Keep the SDK pool_size at least as large as workers so every partition gets its own connection.
+    # Gateway errors are returned in "error", while an invalid mode or key column (not an identifier,
+    # no primary key, or a non-integer key in range mode) raises ValueError like invalid resource IDs do.
+    def DQLPartitioned(self, resource_id, sql_text, biscuit, key_column=None, partitions=None, workers=DEFAULT_WORKERS,
+                       ordered=True, mode="range", page_size=DEFAULT_PAGE_SIZE):
+        try:
+            rows = partitioned_rows(self, resource_id, sql_text, biscuit, key_column, partitions, workers, ordered, mode, page_size)
+            return {"response" : rows, "error" : None}
+
+        except PartitionQueryError as error:
+            return {"response" : None, "error" : str(error)}
+
+    """ Views API """
+    # Execute a view with the given list of parameters
+    # result_format works as for DQL, column dtypes are inferred unless column_types is given.
+    # Text results are served from the result cache when one is configured, and identical concurrent
+    # text reads share one request.
+    def execute_view(self, view_name, parameters_request=[], result_format="text", batch_size=None, column_types=None):
+        validate_string(view_name)
+        self.validate_result_format(result_format)
+
+        if result_format == "text" and (self.result_cache is not None or self.single_flight is not None):
+            read_key = view_key(view_name, parameters_request, self.identity())
+            return self.shared_read(read_key, lambda: self.view_request(view_name, parameters_request))
+
+        return self.view_request(view_name, parameters_request, result_format, batch_size, column_types)
+
+    def view_request(self, view_name, parameters_request, result_format="text", batch_size=None, column_types=None):
+        try:
+            access_token = self.token_manager.access_token()
+
+            api_endpoint = f"/sql/views/{view_name}"
+            headers = {
+                "accept": "application/json",
+                "Authorization" : f'Bearer {access_token}'
+            }
+            params = {"params": self.codec.dumps(parameters_request).decode("utf-8")} if parameters_request else None
+
+            response = self.transport.get(api_endpoint, params=params, headers=headers, stream=result_format != "text")
+            return self.result_data(response, result_format, batch_size, column_types)
+
         except requests.exceptions.RequestException as error:
             return {"response" : None, "error" : str(error)}
 
-   
\ No newline at end of file
+    # Executes a view once for each of many parameter sets (each a parameters_request as taken by
+    # execute_view). Repeated sets run once, and up to `workers` sets run at a time; keep pool_size at
+    # least as large as workers. With result_format="text" the response lists each distinct set in
+    # order with its index, parameters and its own response or error. "columns" and "dataframe"
+    # combine the rows of every set into one columnar result, with tag_column holding the index of
+    # the set each row came from. error is set when any set failed.
+    def execute_views(self, view_name, parameter_sets, workers=DEFAULT_VIEW_WORKERS, result_format="text",
+                      column_types=None, tag_column=DEFAULT_TAG_COLUMN):
+        validate_string(view_name)
+        if result_format not in ("text", "columns", "dataframe"):
+            raise ValueError(f"Unsupported result format {result_format}, expected one of text, columns, dataframe")
+
+        parameter_sets = unique_parameter_sets(parameter_sets)
+        results = iter_view_results(self, view_name, parameter_sets, workers)
+
+        if result_format == "text":
+            results = list(results)
+            failed = [result for result in results if result["error"]]
+            return {"response" : results, "error" : failure_summary(failed, len(parameter_sets))}
+
+        failed = []
+        columns = build_columns(tagged_rows(self.codec, results, tag_column, failed), column_types, result_format == "dataframe")
+        return {"response" : to_dataframe(columns) if result_format == "dataframe" else columns,
+                "error" : failure_summary(failed, len(parameter_sets))}
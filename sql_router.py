@@ -0,0 +1,140 @@
+import re
+from functools import lru_cache
+
+from biscuits import keyword_capability, DQL_SELECT
+from validation import parse_identifiers, is_valid_database_identifier
+
+# Statement types, named after the SDK method each one is routed to.
+CREATE_SCHEMA = "CreateSchema"
+DROP_SCHEMA = "DropSchema"
+CREATE_TABLE = "DDLCreateTable"
+DDL = "DDL"
+DML = "DML"
+DQL = "DQL"
+
+CLASSIFIER_CACHE_SIZE = 4096
+
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_line_comment = re.compile(r"--[^\n]*")
+_block_comment = re.compile(r"/\*.*?\*/", re.DOTALL)
+_identifier = r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)?"
+_keyword = re.compile(r"^\s*(\w+)(?:\s+(\w+))?")
+_create_schema = re.compile(r"^\s*CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?(" + _identifier + ")", re.IGNORECASE)
+_drop_schema = re.compile(r"^\s*DROP\s+SCHEMA\s+(?:IF\s+EXISTS\s+)?(" + _identifier + ")", re.IGNORECASE)
+_foreign_key_reference = re.compile(r"\bREFERENCES\s+(" + _identifier + ")", re.IGNORECASE)
+_table_reference = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|USING|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+(" + _identifier + r")",
+    re.IGNORECASE,
+)
+_parenthesis_or_from = re.compile(r"[()]|\bFROM\b", re.IGNORECASE)
+_subquery_start = re.compile(r"\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+_cte_name = re.compile(r"(?:\bWITH|,)\s*(" + _identifier + r")\s+AS\s*\(", re.IGNORECASE)
+
+DDL_KEYWORDS = ("CREATE", "ALTER", "DROP")
+DML_KEYWORDS = ("INSERT", "UPDATE", "DELETE", "MERGE")
+DQL_KEYWORDS = ("SELECT", "WITH")
+
+
+def strip_literals(sql_text):
+    # Comments and string literals can contain anything that looks like SQL, so they are removed first.
+    sql_text = _block_comment.sub(" ", sql_text)
+    sql_text = _line_comment.sub(" ", sql_text)
+    return _string_literal.sub("''", sql_text)
+
+
+# Blanks out FROM inside parentheses that do not hold a subquery, such as function arguments in
+# EXTRACT(YEAR FROM TS) or TRIM(BOTH FROM NAME), so it is not taken for a table reference.
+def mask_argument_from(code):
+    subquery = []
+    parts = []
+    last = 0
+    for match in _parenthesis_or_from.finditer(code):
+        token = match.group(0)
+        if token == "(":
+            subquery.append(_subquery_start.match(code, match.end()) is not None)
+        elif token == ")":
+            if subquery:
+                subquery.pop()
+        elif subquery and not subquery[-1]:
+            parts.append(code[last:match.start()])
+            parts.append(" " * len(token))
+            last = match.end()
+    parts.append(code[last:])
+    return "".join(parts)
+
+
+class Statement:
+    def __init__(self, sql_text, statement_type, resources, keyword):
+        self.sql_text = sql_text
+        self.statement_type = statement_type
+        self.resources = resources
+        self.keyword = keyword
+
+    # Resource the statement is sent against: the table it creates, changes or first reads.
+    @property
+    def resource_id(self):
+        return self.resources[0] if self.resources else None
+
+    @property
+    def capability(self):
+        return keyword_capability(self.keyword)
+
+    # (resource, capability) pairs the statement needs: its capability on the table it creates,
+    # changes or reads first, and dql_select on the other tables it reads.
+    @property
+    def grants(self):
+        return tuple((resource, self.capability if index == 0 else DQL_SELECT)
+                     for index, resource in enumerate(self.resources))
+
+    # Tables the statement refers to through foreign keys (REFERENCES <table>), as SCHEMA.TABLE.
+    @property
+    def foreign_key_tables(self):
+        references = dict.fromkeys(reference.upper() for reference in _foreign_key_reference.findall(strip_literals(self.sql_text)))
+        return tuple(f"{schema_name}.{table_name}" for schema_name, table_name in parse_identifiers(list(references)))
+
+    def __repr__(self):
+        return f"Statement({self.statement_type}, {self.resources})"
+
+
+# Classifies a statement locally and extracts the resources it references, validating every
+# resource ID. Classification is memoized per statement text.
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def classify(sql_text):
+    code = strip_literals(sql_text)
+    keywords = _keyword.match(code)
+    if keywords is None:
+        raise ValueError("Empty SQL statement")
+    keyword = keywords.group(1).upper()
+    second_keyword = (keywords.group(2) or "").upper()
+
+    if second_keyword == "SCHEMA" and keyword in ("CREATE", "DROP"):
+        schema = (_create_schema if keyword == "CREATE" else _drop_schema).match(code)
+        if schema is None:
+            raise ValueError(f"No schema named by {keyword} SCHEMA statement")
+        schema_name = schema.group(1).upper()
+        if not is_valid_database_identifier(schema_name):
+            raise ValueError(f"Invalid schema identifier {schema.group(1)}")
+        return Statement(sql_text, CREATE_SCHEMA if keyword == "CREATE" else DROP_SCHEMA, (schema_name,), keyword)
+
+    if keyword in DDL_KEYWORDS:
+        statement_type = CREATE_TABLE if keyword == "CREATE" and second_keyword == "TABLE" else DDL
+    elif keyword in DML_KEYWORDS:
+        statement_type = DML
+    elif keyword in DQL_KEYWORDS:
+        statement_type = DQL
+    else:
+        raise ValueError(f"Unsupported SQL statement starting with {keyword}")
+
+    code = mask_argument_from(code)
+    common_table_expressions = {name.upper() for name in _cte_name.findall(code)}
+    resources = []
+    for reference in _table_reference.findall(code):
+        reference = reference.upper()
+        if reference not in common_table_expressions and reference not in resources:
+            resources.append(reference)
+
+    if not resources:
+        raise ValueError(f"No table referenced by {statement_type} statement")
+
+    parsed = parse_identifiers(resources)
+    return Statement(sql_text, statement_type, tuple(f"{schema_name}.{table_name}" for schema_name, table_name in parsed), keyword)
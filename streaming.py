@@ -0,0 +1,118 @@
+import codecs
+import json
+import weakref
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Consumed text is dropped from the parse buffer once it grows past this many characters.
+COMPACT_THRESHOLD = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+def _skip(buffer, position, characters=_whitespace):
+    while position < len(buffer) and buffer[position] in characters:
+        position += 1
+    return position
+
+
+def iter_json_array(chunks):
+    # Incrementally parses a top level JSON array from an iterable of byte (or str) chunks,
+    # yielding each element as soon as it is complete. Only the element being parsed is
+    # held in memory, so a response of any size is read in constant memory.
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+
+    def elements(final):
+        nonlocal position, started, finished
+        while not finished:
+            position = _skip(buffer, position)
+            if position >= len(buffer):
+                return
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError(f"Expected a JSON array but got {buffer[position]!r}")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                finished = True
+                return
+            if buffer[position] == ",":
+                position += 1
+                continue
+            try:
+                element, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                return
+            # A value that runs to the end of the buffer (e.g. a number) may continue in the next chunk.
+            if end == len(buffer) and not final:
+                return
+            position = end
+            yield element
+
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        yield from elements(final=False)
+        if position > COMPACT_THRESHOLD:
+            buffer = buffer[position:]
+            position = 0
+
+    buffer += text_decoder.decode(b"", final=True)
+    yield from elements(final=True)
+    if not finished:
+        raise ValueError("Unexpected end of JSON array")
+
+
+def iter_batches(rows, batch_size):
+    # Groups an iterable of rows into lists of at most batch_size rows.
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_response_rows(response, batch_size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Yields the rows of a streamed requests response, or lists of rows when batch_size is set.
+    # The response is closed once it is exhausted or the generator is discarded.
+    try:
+        rows = iter_json_array(response.iter_content(chunk_size=chunk_size))
+        yield from (iter_batches(rows, batch_size) if batch_size else rows)
+    finally:
+        response.close()
+
+
+class RowStream:
+    # Iterator over the rows of a streamed response, as returned for result_format="stream".
+    # A generator that never started does not run its cleanup, so the response (with its
+    # connection and flow control slot) is also closed by close(), on leaving a with block, and
+    # when the stream is garbage collected, whether or not it was iterated.
+    def __init__(self, response, batch_size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.rows = iter_response_rows(response, batch_size, chunk_size)
+        self.finalizer = weakref.finalize(self, response.close)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.rows)
+
+    def close(self):
+        self.rows.close()
+        self.finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,168 @@
+import asyncio
+import gc
+import io
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_spaceandtimesdk import AsyncSpaceAndTimeSDK
+from flow_control import AdaptiveLimiter, FlowControl, GatewayUnavailableError
+from spaceandtimesdk import SpaceAndTimeSDK
+
+ROWS = b'[{"ID": 1}, {"ID": 2}, {"ID": 3}]'
+
+
+def streamed_response():
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(ROWS)
+    return response
+
+
+# SDK whose gateway calls return streamed_response() under a small SQL concurrency limit.
+def stream_sdk(limit=4):
+    flow_control = FlowControl(initial_limit=limit, max_limit=limit, acquire_timeout=1)
+    sdk = SpaceAndTimeSDK(session_file=None, use_env=False, user_id="test-user", background_refresh=False,
+                          coalesce=False, flow_control=flow_control)
+    expires = int((time.time() + 3600) * 1000)
+    sdk.token_manager.update({"accessToken": "access", "refreshToken": "refresh",
+                              "accessTokenExpires": expires, "refreshTokenExpires": expires})
+    sdk.transport.send = lambda method, path, **kwargs: streamed_response()
+    return sdk, flow_control
+
+
+def sql_in_flight(flow_control):
+    return flow_control.stats()["sql"]["in_flight"]
+
+
+def test_abandoned_unstarted_streams_release_their_slots():
+    sdk, flow_control = stream_sdk()
+    for _ in range(12):
+        dql_data = sdk.DQL("SC.TB", "SELECT * FROM SC.TB", "", result_format="stream")
+        assert dql_data["error"] is None
+        del dql_data
+        gc.collect()
+    assert sql_in_flight(flow_control) == 0
+
+
+def test_partially_read_and_closed_streams_release_their_slots():
+    sdk, flow_control = stream_sdk()
+    streams = [sdk.DQL("SC.TB", "SELECT * FROM SC.TB", "", result_format="stream")["response"] for _ in range(4)]
+    assert sql_in_flight(flow_control) == 4
+
+    assert next(streams[0]) == {"ID": 1}
+    streams[0].close()
+    with streams[1] as rows:
+        assert next(rows) == {"ID": 1}
+    assert list(streams[2]) == [{"ID": 1}, {"ID": 2}, {"ID": 3}]
+    del streams[3]
+    gc.collect()
+    assert sql_in_flight(flow_control) == 0
+
+
+def test_stream_slot_is_released_once():
+    sdk, flow_control = stream_sdk()
+    rows = sdk.DQL("SC.TB", "SELECT * FROM SC.TB", "", result_format="stream")["response"]
+    list(rows)
+    rows.close()
+    rows.close()
+    assert sql_in_flight(flow_control) == 0
+    assert flow_control.stats()["sql"]["limit"] == 4
+
+
+# Calls failing with each of `errors` in turn, then succeeding.
+def failing_send(errors):
+    errors = list(errors)
+
+    def send():
+        if errors:
+            raise errors.pop(0)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+    return send
+
+
+def test_breaker_trial_failing_mid_body_reopens_the_breaker():
+    flow_control = FlowControl(failure_threshold=1, reset_timeout=0.01, max_attempts=1)
+    send = failing_send([requests.exceptions.ConnectionError(), requests.exceptions.ChunkedEncodingError()])
+    for error in (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+        time.sleep(0.03)
+        try:
+            flow_control.call("GET", "/sql/dql", send)
+        except error:
+            pass
+    assert flow_control.gate("/sql/dql").breaker.reset_timeout == 0.02
+    time.sleep(0.05)
+    assert flow_control.call("GET", "/sql/dql", send).status_code == 200
+    assert flow_control.stats()["sql"]["breaker"] == "closed"
+
+
+def test_abandoned_breaker_trial_lets_the_next_call_through():
+    flow_control = FlowControl(failure_threshold=1, reset_timeout=0.01, max_attempts=1)
+    send = failing_send([requests.exceptions.ConnectionError(), KeyboardInterrupt()])
+    try:
+        flow_control.call("GET", "/sql/dql", send)
+    except requests.exceptions.ConnectionError:
+        pass
+    try:
+        flow_control.call("GET", "/sql/dql", send)
+    except GatewayUnavailableError:
+        pass
+    time.sleep(0.02)
+    try:
+        flow_control.call("GET", "/sql/dql", send)
+    except KeyboardInterrupt:
+        pass
+    assert flow_control.call("GET", "/sql/dql", send).status_code == 200
+    assert flow_control.stats()["sql"]["breaker"] == "closed"
+    assert sql_in_flight(flow_control) == 0
+
+
+def test_cancelled_async_breaker_trial_lets_the_next_call_through():
+    flow_control = FlowControl(failure_threshold=1, reset_timeout=0.01, max_attempts=1)
+    sdk = AsyncSpaceAndTimeSDK(session_file=None, use_env=False, user_id="test-user", background_refresh=False,
+                               flow_control=flow_control)
+    outcomes = [(None, None, {"response": None, "error": "connection refused"}), asyncio.CancelledError()]
+
+    async def send(method, api_endpoint, **kwargs):
+        if outcomes:
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        return 200, {}, {"response": "[]", "error": None}
+
+    async def run():
+        assert (await sdk.request("POST", "/sql/dql"))["error"] == "connection refused"
+        await asyncio.sleep(0.02)
+        try:
+            await sdk.request("POST", "/sql/dql")
+        except asyncio.CancelledError:
+            pass
+        return await sdk.request("POST", "/sql/dql")
+
+    sdk.send = send
+    try:
+        assert asyncio.run(run()) == {"response": "[]", "error": None}
+    finally:
+        sdk.auth_sdk.close()
+    assert flow_control.stats()["sql"]["breaker"] == "closed"
+
+
+def test_limiter_decreases_once_per_window_and_grows_back():
+    limiter = AdaptiveLimiter(initial_limit=10, min_limit=1, max_limit=10, decrease_factor=0.5)
+    tickets = [limiter.acquire(timeout=0) for _ in range(10)]
+    assert limiter.try_acquire() is None
+    for ticket in tickets:
+        limiter.release(ticket, overloaded=True)
+    assert limiter.limit == 5
+    assert limiter.in_flight == 0
+
+    for _ in range(20):
+        limiter.release(limiter.acquire(timeout=0))
+    assert 8 < limiter.limit <= 10
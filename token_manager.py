@@ -0,0 +1,215 @@
+import threading
+import time
+
+from instrumentation import record_token_wait
+from token_store import MemoryTokenStore
+
+# Tokens are renewed once they have this many seconds or less left.
+MINIMUM_TOKEN_SECONDS = 120
+
+# The background thread renews this many seconds before callers would have to.
+BACKGROUND_AHEAD_SECONDS = 30
+
+# Delay before the background thread retries a failed renewal.
+RETRY_SECONDS = 5
+
+# Margins are capped at this fraction of the token lifetime, so tokens living shorter than the
+# margin are not renewed again as soon as they arrive.
+MAX_MARGIN_FRACTION = 0.5
+
+# The background thread waits at least this long between two renewals.
+MIN_RENEWAL_INTERVAL = 1
+
+# Expiry values below this are durations in milliseconds rather than epoch milliseconds.
+EPOCH_MILLISECONDS_THRESHOLD = 10 ** 11
+
+
+def absolute_expiry(expires, now=None):
+    # Converts a token expiry received from the gateway to epoch seconds.
+    expires = int(expires)
+    now = time.time() if now is None else now
+    if expires < EPOCH_MILLISECONDS_THRESHOLD:
+        return now + expires / 1000
+    return expires / 1000
+
+
+class TokenManager:
+    # Holds the access and refresh tokens in memory with absolute expiry times.
+    # Reads on the hot path never touch the disk; renewals are single-flight so that when
+    # many threads find an expiring token only one of them calls /auth/refresh (or
+    # re-authenticates) while the rest wait for its result.
+    # Tokens are persisted to `store` (see token_store). Renewals hold the store's refresh lock,
+    # so processes sharing a store renew once and the others adopt the stored tokens.
+    def __init__(self, sdk, refresh_margin=MINIMUM_TOKEN_SECONDS, background=True, store=None):
+        self.sdk = sdk
+        self.refresh_margin = refresh_margin
+        self.background = background
+        self.store = MemoryTokenStore() if store is None else store
+        self.store_version = None
+
+        self.tokens = None
+        self.access_expiry = 0
+        self.refresh_expiry = 0
+        # Lifetime of the last access token received from the gateway, None until one is.
+        self.access_lifetime = None
+        self.loaded = False
+
+        self.lock = threading.Lock()
+        self.in_flight = None
+        self.last_error = None
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # Loads the persisted session once, the first time tokens are needed.
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            self.sync()
+
+    # Adopts tokens stored by another process (or SDK) when they last longer than ours.
+    # Called with the lock held.
+    def sync(self):
+        self.store_version = self.store.version()
+        tokens = self.store.load()
+        if not tokens or not tokens["accessToken"] or not tokens["accessTokenExpires"]:
+            if self.tokens is not None and self.store.shared:
+                # Another process logged out.
+                self.tokens = None
+                self.access_expiry = self.refresh_expiry = 0
+            return
+        if self.tokens is None or absolute_expiry(tokens["accessTokenExpires"]) > self.access_expiry:
+            self.set_tokens(tokens, persist=False)
+
+    # Stores tokens from an /auth/token or /auth/refresh response.
+    def update(self, tokens):
+        with self.lock:
+            self.loaded = True
+            self.set_tokens(tokens, persist=True)
+
+    def set_tokens(self, tokens, persist):
+        # The session file keeps absolute expiry times so a restarted process knows when they run out.
+        now = time.time()
+        self.access_expiry = absolute_expiry(tokens["accessTokenExpires"], now)
+        self.refresh_expiry = absolute_expiry(tokens["refreshTokenExpires"], now)
+        # Margins are capped by the lifetime of tokens fresh from the gateway. The time left on
+        # stored tokens says nothing about their lifetime, so loading them keeps the last one.
+        if persist:
+            self.access_lifetime = self.access_expiry - now
+        self.tokens = {
+            "accessToken": tokens["accessToken"],
+            "refreshToken": tokens["refreshToken"],
+            "accessTokenExpires": int(self.access_expiry * 1000),
+            "refreshTokenExpires": int(self.refresh_expiry * 1000)
+        }
+        if persist:
+            self.store.save(self.tokens)
+            self.store_version = self.store.version()
+        self.start_background_refresh()
+
+    def clear(self):
+        with self.lock:
+            self.tokens = None
+            self.access_expiry = 0
+            self.refresh_expiry = 0
+            self.store.clear()
+            self.store_version = self.store.version()
+
+    def effective_margin(self, margin):
+        if self.access_lifetime is None:
+            return margin
+        return min(margin, self.access_lifetime * MAX_MARGIN_FRACTION)
+
+    def is_fresh(self, margin=None):
+        margin = self.effective_margin(self.refresh_margin if margin is None else margin)
+        return self.tokens is not None and self.access_expiry - time.time() > margin
+
+    def needs_renewal(self):
+        if not self.loaded:
+            self.load()
+        elif self.store.shared and self.store.version() != self.store_version:
+            with self.lock:
+                self.sync()
+        return not self.is_fresh()
+
+    # Returns a valid access token, renewing it first if it is about to expire.
+    def access_token(self):
+        if self.needs_renewal():
+            started = time.perf_counter()
+            try:
+                self.renew()
+            finally:
+                record_token_wait(time.perf_counter() - started)
+        return self.tokens["accessToken"]
+
+    def refresh_token(self):
+        if not self.loaded:
+            self.load()
+        return self.tokens["refreshToken"] if self.tokens else ""
+
+    # Renews the tokens unless they are still fresh. Concurrent callers share one renewal.
+    def renew(self, margin=None):
+        with self.lock:
+            if self.is_fresh(margin):
+                return
+            event = self.in_flight
+            leader = event is None
+            if leader:
+                event = self.in_flight = threading.Event()
+
+        if not leader:
+            event.wait()
+            if not self.is_fresh(margin) and self.last_error:
+                raise Exception(self.last_error)
+            return
+
+        try:
+            self.last_error = None
+            with self.store.refresh_lock():
+                # Another process may have renewed the tokens while this one waited for the lock.
+                with self.lock:
+                    self.sync()
+                if not self.is_fresh(margin):
+                    self.renew_tokens()
+        except Exception as error:
+            self.last_error = str(error)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight = None
+            event.set()
+
+    # Uses the refresh token while it is valid, otherwise authenticates again.
+    def renew_tokens(self):
+        if self.tokens is not None and self.refresh_expiry - time.time() > self.refresh_margin:
+            refresh_data = self.sdk.refresh_token()
+            if refresh_data["error"] is None:
+                return
+        self.sdk.authenticate()
+
+    def start_background_refresh(self):
+        if not self.background or self.stop_event.is_set():
+            return
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.background_refresh, name="sxt-token-refresh", daemon=True)
+        self.thread.start()
+
+    # Renews the tokens shortly before they reach the refresh margin so callers never wait on it.
+    def background_refresh(self):
+        margin = self.refresh_margin + BACKGROUND_AHEAD_SECONDS
+        while not self.stop_event.is_set() and self.tokens is not None:
+            delay = self.access_expiry - self.effective_margin(margin) - time.time()
+            if delay > 0:
+                self.stop_event.wait(delay)
+                continue
+            try:
+                self.renew(margin)
+                self.stop_event.wait(MIN_RENEWAL_INTERVAL)
+            except Exception:
+                self.stop_event.wait(RETRY_SECONDS)
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,201 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on Windows, file stores are then only safe within one process.
+    fcntl = None
+
+SESSION_FILE = "session.txt"
+TOKEN_FIELDS = ("accessToken", "refreshToken", "accessTokenExpires", "refreshTokenExpires")
+
+# Layout of a shared token file: magic, sequence number, payload length, then the JSON payload.
+SHARED_MAGIC = b"SXTTOK01"
+SHARED_HEADER = struct.Struct("<8sQI")
+SHARED_SEQUENCE_OFFSET = 8
+DEFAULT_SHARED_SIZE = 4096
+SHARED_READ_ATTEMPTS = 1000
+
+
+def read_session_file(path):
+    # Reads the four line session file, raises FileNotFoundError when there is none.
+    with open(path) as file:
+        lines = [file.readline().strip() for _ in TOKEN_FIELDS]
+    return dict(zip(TOKEN_FIELDS, lines))
+
+
+def write_session_file(path, tokens):
+    # Written to a temporary file first and renamed, so readers never see a half-written session.
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "w") as file:
+        for field in TOKEN_FIELDS:
+            file.write(str(tokens[field]) + "\n")
+    os.replace(temporary_path, path)
+
+
+@contextmanager
+def file_lock(path):
+    # Exclusive advisory lock held through its own open file, so it also excludes other
+    # threads of this process.
+    if fcntl is None:
+        yield
+        return
+    descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(descriptor)
+
+
+class MemoryTokenStore:
+    # Tokens kept in this process only.
+    shared = False
+
+    def __init__(self):
+        self.tokens = None
+        self.lock = threading.Lock()
+        self.sequence = 0
+
+    def load(self):
+        return dict(self.tokens) if self.tokens else None
+
+    def save(self, tokens):
+        with self.lock:
+            self.tokens = dict(tokens)
+            self.sequence += 1
+
+    def clear(self):
+        with self.lock:
+            self.tokens = None
+            self.sequence += 1
+
+    def version(self):
+        return self.sequence
+
+    # Renewals are already single-flight within a process.
+    @contextmanager
+    def refresh_lock(self):
+        yield
+
+
+class FileTokenStore:
+    # The plain text session file (session.txt by default), replaced atomically on every save.
+    # Renewals take a lock file next to it, so processes sharing the file renew one at a time
+    # and the later ones pick up the tokens the first one wrote.
+    shared = False
+
+    def __init__(self, path=SESSION_FILE):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def load(self):
+        try:
+            tokens = read_session_file(self.path)
+        except FileNotFoundError:
+            return None
+        return tokens if all(tokens.values()) else None
+
+    def save(self, tokens):
+        write_session_file(self.path, tokens)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def version(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh_lock(self):
+        return file_lock(self.lock_path)
+
+
+class SharedTokenStore:
+    # Token set shared by every process on the host through a memory mapped file. Writers take
+    # an exclusive lock and bump a sequence number before and after writing (odd while a write
+    # is in progress); readers copy the payload without locking and retry if the sequence moved.
+    # Checking whether another process stored new tokens is a read of the mapped sequence
+    # number, so the hot path makes no system calls.
+    shared = True
+
+    def __init__(self, path, size=DEFAULT_SHARED_SIZE):
+        if fcntl is None:
+            raise RuntimeError("SharedTokenStore needs fcntl, which this platform does not have")
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.size = size
+        self.lock = threading.Lock()
+
+        self.descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self.write_lock():
+            if os.fstat(self.descriptor).st_size < size:
+                os.ftruncate(self.descriptor, size)
+            self.map = mmap.mmap(self.descriptor, size)
+            magic, _, _ = SHARED_HEADER.unpack_from(self.map, 0)
+            if magic != SHARED_MAGIC:
+                SHARED_HEADER.pack_into(self.map, 0, SHARED_MAGIC, 0, 0)
+
+    @contextmanager
+    def write_lock(self):
+        with self.lock:
+            fcntl.flock(self.descriptor, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.descriptor, fcntl.LOCK_UN)
+
+    def version(self):
+        return struct.unpack_from("<Q", self.map, SHARED_SEQUENCE_OFFSET)[0]
+
+    def load(self):
+        for _ in range(SHARED_READ_ATTEMPTS):
+            sequence = self.version()
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            _, _, length = SHARED_HEADER.unpack_from(self.map, 0)
+            payload = self.map[SHARED_HEADER.size:SHARED_HEADER.size + length]
+            if self.version() == sequence:
+                return json.loads(payload) if length else None
+
+        # A sequence number that stays odd while nobody holds the lock is a writer that died mid-write.
+        with self.write_lock():
+            if self.version() % 2:
+                return None
+        return self.load()
+
+    def write(self, payload):
+        if SHARED_HEADER.size + len(payload) > self.size:
+            raise ValueError(f"Tokens take {len(payload)} bytes, more than the {self.size} byte shared store holds")
+        with self.write_lock():
+            # Rounded up to even, in case an earlier writer died mid-write.
+            sequence = self.version()
+            sequence += sequence % 2
+            struct.pack_into("<Q", self.map, SHARED_SEQUENCE_OFFSET, sequence + 1)
+            self.map[SHARED_HEADER.size:SHARED_HEADER.size + len(payload)] = payload
+            SHARED_HEADER.pack_into(self.map, 0, SHARED_MAGIC, sequence + 1, len(payload))
+            struct.pack_into("<Q", self.map, SHARED_SEQUENCE_OFFSET, sequence + 2)
+
+    def save(self, tokens):
+        self.write(json.dumps({field: tokens[field] for field in TOKEN_FIELDS}).encode())
+
+    def clear(self):
+        self.write(b"")
+
+    def refresh_lock(self):
+        return file_lock(self.lock_path)
+
+    def close(self):
+        self.map.close()
+        os.close(self.descriptor)
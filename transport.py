@@ -0,0 +1,155 @@
+import time
+
+import requests
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+from codec import encode_json_body, get_codec
+from instrumentation import Instrumentation, TimedHTTPAdapter, request_size, retry_count, take_pending, wire_size
+
+# HTTP methods that are safe to replay after a failed read.
+# POST is never retried once the request has reached the gateway.
+IDEMPOTENT_METHODS = frozenset(["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE"])
+
+# Gateway responses that are worth retrying for idempotent calls.
+RETRY_STATUS_CODES = (502, 503, 504)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+# Every response encoding urllib3 can decode here: gzip and deflate, plus br and zstd when
+# brotli / zstandard are installed.
+DEFAULT_ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class Transport:
+    # Pooled keep-alive HTTP transport shared by every SDK call.
+    # Connections to the gateway are reused across calls so only the first
+    # request on each pooled connection pays the TCP + TLS handshake.
+    def __init__(self, base_url, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, keep_alive=True, hooks=None, codec=None,
+                 compress_min_bytes=None, accept_encoding=DEFAULT_ACCEPT_ENCODING, flow_control=None):
+        self.base_url = base_url
+        # Optional flow_control.FlowControl limiting concurrency per endpoint class and retrying throttled calls.
+        self.flow_control = flow_control
+        # JSON bodies are encoded with `codec` (see codec.get_codec) and gzip compressed once they
+        # reach compress_min_bytes; None never compresses.
+        self.codec = get_codec(codec)
+        self.compress_min_bytes = compress_min_bytes
+        self.instrumentation = hooks if isinstance(hooks, Instrumentation) else Instrumentation(hooks)
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Connection errors are retried for every method since the request never left the client,
+        # read errors and retryable statuses only for idempotent methods. With flow control, 503 is
+        # left to it so the concurrency limit sees the overload.
+        retry_status_codes = RETRY_STATUS_CODES if flow_control is None else tuple(code for code in RETRY_STATUS_CODES if code != 503)
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=retry_status_codes,
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.session.headers["Accept-Encoding"] = accept_encoding
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def url(self, path):
+        return path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+
+    # Sends a request through the pooled session, `timeout` overrides the (connect, read) default.
+    # A `json` body is encoded with the transport's codec instead of the requests encoder.
+    def request(self, method, path, timeout=None, **kwargs):
+        if kwargs.get("json") is not None:
+            kwargs["data"], kwargs["headers"] = encode_json_body(self.codec, kwargs.pop("json"), kwargs.get("headers"), self.compress_min_bytes)
+        kwargs["timeout"] = timeout or self.timeout
+        if self.flow_control is None:
+            return self.send(method, path, **kwargs)
+        return self.flow_control.call(method, path, lambda: self.send(method, path, **kwargs), kwargs.get("stream", False))
+
+    def send(self, method, path, **kwargs):
+        if not self.instrumentation:
+            return self.session.request(method, self.url(path), **kwargs)
+        return self.instrumented_request(method, path, **kwargs)
+
+    # Sends the request with the body deferred so the time to the response headers and the time
+    # to read the body are reported separately. Streamed responses are reported when closed.
+    def instrumented_request(self, method, path, stream=False, **kwargs):
+        event = self.instrumentation.start(method, path)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), stream=True, **kwargs)
+        except Exception as error:
+            event.connect = take_pending("connect")
+            event.error = error
+            self.instrumentation.finish(event, started)
+            raise
+
+        event.connect = take_pending("connect")
+        event.ttfb = time.perf_counter() - started
+        event.status = response.status_code
+        event.request_bytes = request_size(response.request)
+        event.retries = retry_count(response)
+
+        def finish():
+            event.download = time.perf_counter() - started - event.ttfb
+            event.response_bytes = wire_size(response, event.response_bytes)
+            self.instrumentation.finish(event, started)
+
+        if stream:
+            close = response.close
+            iter_content = response.iter_content
+
+            def counted_iter_content(*args, **kwargs):
+                for chunk in iter_content(*args, **kwargs):
+                    event.response_bytes += len(chunk)
+                    yield chunk
+
+            def close_and_report():
+                close()
+                if event.total == 0.0:
+                    finish()
+
+            response.iter_content = counted_iter_content
+            response.close = close_and_report
+            return response
+
+        try:
+            event.response_bytes = len(response.content)
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            finish()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
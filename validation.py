@@ -1,7 +1,7 @@
 import re
 import base64
 import binascii
-from Cryptodome.Cipher import AES
+from functools import lru_cache
 
 def validate_number(number_val):
     if not isinstance(number_val, int):
@@ -24,9 +24,8 @@ def is_base64(s):
         # Pad the string with '=' characters
         s += '=' * (-len(s) % 4)
 
-        # Attempt to decrypt using a dummy key and IV
-        cipher = AES.new(b'A' * 32, AES.MODE_CBC, iv=b'B' * 16)
-        cipher.decrypt(base64.b64decode(s))
+        # Strict decoding rejects any character outside the Base64 alphabet
+        base64.b64decode(s, validate=True)
         return True
     except (binascii.Error, ValueError) as error:
         raise binascii.Error("The Input String is not URL-safe base64 encoded.")
@@ -41,9 +40,17 @@ VALID_DB_RESOURCE_IDENTIFIER = "^[A-Z_][A-Z0-9_]+$"
 INVALID_RESOURCEID = "Invalid resourceId"
 DEFAULT_SCHEMA = "PUBLIC"
 
+_valid_db_resource_identifier = re.compile(VALID_DB_RESOURCE_IDENTIFIER)
+
+# Number of parsed resource identifiers kept by try_parse_identifier.
+IDENTIFIER_CACHE_SIZE = 65536
+
 def is_valid_database_identifier(input):
-    return re.match(VALID_DB_RESOURCE_IDENTIFIER, input) is not None
+    return _valid_db_resource_identifier.match(input) is not None
 
+# Parses "SCHEMA.TABLE" (or "TABLE" in the PUBLIC schema) into upper cased (schema, table).
+# Results are memoized so repeated resource IDs cost a dictionary lookup.
+@lru_cache(maxsize=IDENTIFIER_CACHE_SIZE)
 def try_parse_identifier(resource_id):
     parts = resource_id.upper().split(".")
     if len(parts) == 0 or len(parts) > 2:
@@ -58,3 +65,16 @@ def try_parse_identifier(resource_id):
         raise ValueError(INVALID_RESOURCEID + ": Either schema or table identifier is invalid")
     return (schema_name, table_name)
 
+# Parses many resource IDs at once, returning their (schema, table) pairs in order.
+# Every invalid ID is reported in a single ValueError.
+def parse_identifiers(resource_ids):
+    parsed = []
+    invalid = []
+    for resource_id in resource_ids:
+        try:
+            parsed.append(try_parse_identifier(resource_id))
+        except ValueError:
+            invalid.append(resource_id)
+    if invalid:
+        raise ValueError(INVALID_RESOURCEID + ": " + ", ".join(str(resource_id) for resource_id in invalid))
+    return parsed
@@ -0,0 +1,63 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from result_cache import parameters_key
+
+DEFAULT_VIEW_WORKERS = 8
+
+# Column of a combined result holding the index of the parameter set each row came from.
+DEFAULT_TAG_COLUMN = "PARAMETER_SET"
+
+
+# Drops repeated parameter sets, keeping the first occurrence of each in order.
+def unique_parameter_sets(parameter_sets):
+    seen = set()
+    unique = []
+    for parameters_request in parameter_sets:
+        key = parameters_key(parameters_request)
+        if key not in seen:
+            seen.add(key)
+            unique.append(parameters_request or [])
+    return unique
+
+
+# Executes the view once per parameter set on `workers` threads and yields
+# {"parameter_set", "parameters", "response", "error"} results in parameter set order.
+# At most `workers` executions are in flight or waiting to be consumed at a time.
+def iter_view_results(sdk, view_name, parameter_sets, workers=DEFAULT_VIEW_WORKERS):
+    def run(index, parameters_request):
+        view_data = sdk.execute_view(view_name, parameters_request)
+        return {
+            "parameter_set": index,
+            "parameters": parameters_request,
+            "response": view_data["response"],
+            "error": view_data["error"]
+        }
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for index, parameters_request in enumerate(parameter_sets):
+            pending.append(executor.submit(run, index, parameters_request))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Yields the rows of every successful result with tag_column set to its parameter set index,
+# collecting the failed results in `failed`.
+def tagged_rows(codec, results, tag_column, failed):
+    for result in results:
+        if result["error"]:
+            failed.append(result)
+            continue
+        for row in codec.loads(result["response"]):
+            row[tag_column] = result["parameter_set"]
+            yield row
+
+
+def failure_summary(failed, total):
+    if not failed:
+        return None
+    first = failed[0]
+    return f"{len(failed)} of {total} parameter sets failed, parameter set {first['parameter_set']}: {first['error']}"